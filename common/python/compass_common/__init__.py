@@ -0,0 +1,17 @@
+from compass_common.allowance_planner import AllowancePlanner
+from compass_common.allowances import AllowanceReader
+from compass_common.async_tx_engine import AsyncTxSubmitter
+from compass_common.earn_accounts import EarnAccountRegistry
+from compass_common.nonce_manager import NonceManager
+from compass_common.tx_engine import TxSubmitter, TransactionFailed, unsigned_tx
+
+__all__ = [
+    "AllowancePlanner",
+    "AllowanceReader",
+    "AsyncTxSubmitter",
+    "EarnAccountRegistry",
+    "NonceManager",
+    "TransactionFailed",
+    "TxSubmitter",
+    "unsigned_tx",
+]
@@ -0,0 +1,63 @@
+"""Only the allowance transactions a flow actually needs.
+
+The flows check one allowance at a time ("if allowance < required: set it and
+wait a block") or set every allowance unconditionally. ``AllowancePlanner``
+takes all ``(token, spender, amount)`` requirements of a flow, reads the
+current allowances in one ``AllowanceReader`` batch (cached for the block) and
+returns only the ones that are too low:
+
+    planner = AllowancePlanner(AllowanceReader(w3, compass, "arbitrum"), owner)
+    actions = planner.operations([("USDC", "AaveV3Pool", 10)]) + actions
+
+Requirements for the same (token, spender) add up, since every action spends
+its own amount out of the one allowance. A missing allowance is set to exactly
+the required amount.
+"""
+
+from decimal import Decimal
+
+from compass_api_sdk import models
+
+
+class AllowancePlanner:
+    def __init__(self, reader, owner):
+        self.reader = reader
+        self.owner = owner
+
+    def missing(self, requirements):
+        """``[(token, spender, amount)]`` whose current allowance is too low.
+
+        Amounts of repeated (token, spender) pairs are summed; the result keeps
+        the order in which the pairs first appear.
+        """
+        required = {}
+        for token, spender, amount in requirements:
+            pair = (token, spender)
+            required[pair] = required.get(pair, Decimal(0)) + Decimal(str(amount))
+        if not required:
+            return []
+
+        current = self.reader.read_cells(
+            (self.owner, token, spender) for token, spender in required
+        )
+        return [
+            (token, spender, amount)
+            for (token, spender), amount in required.items()
+            # None: the allowance could not be read, so set it to be safe
+            if current[(self.owner, token, spender)] is None
+            or current[(self.owner, token, spender)] < amount
+        ]
+
+    def operations(self, requirements):
+        """Bundle ``SET_ALLOWANCE`` operations for the missing allowances."""
+        return [
+            models.UserOperation(
+                body=models.SetAllowanceParams(
+                    ACTION_TYPE="SET_ALLOWANCE",
+                    token=token,
+                    contract=spender,
+                    amount=str(amount),
+                )
+            )
+            for token, spender, amount in self.missing(requirements)
+        ]
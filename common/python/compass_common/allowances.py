@@ -0,0 +1,249 @@
+"""Read ERC-20 allowances for a whole (owner x token x spender) matrix at once.
+
+Checking allowances one ``generic_allowance`` call at a time costs one API
+round trip per (owner, token, spender). ``AllowanceReader`` instead:
+
+- resolves every (token, spender) pair given by symbol or contract name with
+  a single ``generic_allowance`` call (its response carries the token and
+  contract addresses and the token decimals); resolutions are kept forever,
+- reads the allowances of all owners through Multicall3 ``aggregate3``,
+  ``batch_size`` calls per ``eth_call``,
+- falls back to parallel ``generic_allowance`` calls where Multicall3 is not
+  available,
+- keeps the table until the next block: reading the same cells again within
+  a block costs one ``eth_blockNumber``.
+
+Amounts are ``Decimal`` token units, like the ``amount`` of the SDK response.
+
+    reader = AllowanceReader(w3, compass, "arbitrum")
+    table = reader.read(owners, ["USDC", pt_address], ["PendleRouter"])
+    table[(owner, "USDC", "PendleRouter")]
+"""
+
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from eth_abi import decode, encode
+from web3 import Web3
+
+# deployed at the same address on every major EVM chain
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+AGGREGATE3_ABI = [
+    {
+        "name": "aggregate3",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+]
+
+ALLOWANCE_SELECTOR = bytes.fromhex("dd62ed3e")  # allowance(address,address)
+DECIMALS_SELECTOR = bytes.fromhex("313ce567")  # decimals()
+
+
+def _is_address(value):
+    return isinstance(value, str) and Web3.is_address(value)
+
+
+class AllowanceReader:
+    def __init__(
+        self,
+        w3,
+        compass=None,
+        chain=None,
+        multicall_address=MULTICALL3,
+        batch_size=500,
+        max_workers=16,
+        server_url=None,
+    ):
+        self.w3 = w3
+        self.compass = compass
+        self.chain = chain
+        self.server_url = server_url
+        self.batch_size = batch_size
+        self.multicall = w3.eth.contract(
+            address=Web3.to_checksum_address(multicall_address), abi=AGGREGATE3_ABI
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="allowances"
+        )
+        self._lock = threading.Lock()
+        # (token, spender) as given -> (token address, spender address, decimals)
+        self._resolved = {}
+        self._block = None
+        self._table = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _sdk_allowance(self, owner, token, spender):
+        universal = self.compass.universal
+        # older SDK releases name the method `allowance`
+        fn = getattr(universal, "generic_allowance", None) or universal.allowance
+        return fn(
+            chain=self.chain,
+            user=owner,
+            token=token,
+            contract=spender,
+            server_url=self.server_url,
+        )
+
+    def read(self, owners, tokens, spenders):
+        """Allowances of every combination of ``owners``, ``tokens`` and ``spenders``."""
+        return self.read_cells(itertools.product(owners, tokens, spenders))
+
+    def read_cells(self, cells):
+        """Allowances of the given ``(owner, token, spender)`` cells.
+
+        Tokens and spenders may be addresses, symbols or contract names as
+        accepted by the Compass API; the returned keys are the cells as given.
+        """
+        cells = list(dict.fromkeys(cells))
+        block = self.w3.eth.block_number
+        with self._lock:
+            if block != self._block:
+                self._block, self._table = block, {}
+            table = self._table
+
+        missing = [cell for cell in cells if cell not in table]
+        if missing:
+            found = self._resolve(missing, block)
+            found.update(
+                self._read_onchain([c for c in missing if c not in found], block)
+            )
+            table.update(found)
+        return {cell: table[cell] for cell in cells}
+
+    def _resolve(self, cells, block):
+        """Resolve unknown (token, spender) pairs; returns the cells read doing so."""
+        pending = {}
+        for owner, token, spender in cells:
+            pair = (token, spender)
+            if pair not in self._resolved and pair not in pending:
+                pending[pair] = owner
+
+        by_name = {p: o for p, o in pending.items() if not all(map(_is_address, p))}
+        by_address = [p for p in pending if p not in by_name]
+
+        if by_address:
+            tokens = list(dict.fromkeys(token for token, _ in by_address))
+            try:
+                results = self._aggregate(
+                    [(token, DECIMALS_SELECTOR) for token in tokens], block
+                )
+            except Exception:
+                if self.compass is None:
+                    raise
+                # no Multicall3: let the API resolve these pairs as well
+                by_name.update((pair, pending[pair]) for pair in by_address)
+            else:
+                decimals = {
+                    token: decode(["uint8"], data)[0] if ok and len(data) >= 32 else 18
+                    for token, (ok, data) in zip(tokens, results)
+                }
+                for token, spender in by_address:
+                    self._resolved[(token, spender)] = (
+                        Web3.to_checksum_address(token),
+                        Web3.to_checksum_address(spender),
+                        decimals[token],
+                    )
+
+        found = {}
+        if by_name:
+            if self.compass is None:
+                raise ValueError("symbols and contract names need a Compass API client")
+            futures = {
+                (owner, *pair): self.executor.submit(self._sdk_allowance, owner, *pair)
+                for pair, owner in by_name.items()
+            }
+            for (owner, token, spender), future in futures.items():
+                response = future.result()
+                self._resolved[(token, spender)] = (
+                    Web3.to_checksum_address(response.token_address),
+                    Web3.to_checksum_address(response.contract_address),
+                    int(response.decimals),
+                )
+                found[(owner, token, spender)] = Decimal(str(response.amount))
+        return found
+
+    def _read_onchain(self, cells, block):
+        if not cells:
+            return {}
+        calls = []
+        for owner, token, spender in cells:
+            token_address, spender_address, _ = self._resolved[(token, spender)]
+            data = ALLOWANCE_SELECTOR + encode(
+                ["address", "address"],
+                [Web3.to_checksum_address(owner), spender_address],
+            )
+            calls.append((token_address, data))
+
+        try:
+            results = self._aggregate(calls, block)
+        except Exception:
+            if self.compass is None:
+                raise
+            # no Multicall3 on this chain (or node): one SDK call per cell
+            futures = {
+                cell: self.executor.submit(self._sdk_allowance, *cell) for cell in cells
+            }
+            return {
+                cell: Decimal(str(future.result().amount))
+                for cell, future in futures.items()
+            }
+
+        table = {}
+        for cell, (ok, data) in zip(cells, results):
+            decimals = self._resolved[cell[1:]][2]
+            table[cell] = (
+                Decimal(decode(["uint256"], data)[0]).scaleb(-decimals)
+                if ok and len(data) >= 32
+                else None
+            )
+        return table
+
+    def _aggregate(self, calls, block):
+        """``[(target, calldata)]`` -> ``[(success, return data)]`` via Multicall3."""
+        chunks = [
+            calls[i : i + self.batch_size] for i in range(0, len(calls), self.batch_size)
+        ]
+
+        def run(chunk):
+            return self.multicall.functions.aggregate3(
+                [(target, True, data) for target, data in chunk]
+            ).call(block_identifier=block)
+
+        results = []
+        # the chunks are independent eth_calls: send them concurrently
+        for chunk_result in self.executor.map(run, chunks):
+            results.extend(chunk_result)
+        return results
@@ -0,0 +1,157 @@
+"""asyncio counterpart of ``TxSubmitter`` for ``AsyncWeb3``.
+
+One event loop can drive the flows of many users at once; every flow awaits
+its RPC calls instead of holding a thread. Nonces come from the wallet's
+shared ``NonceManager``, the one ``TxSubmitter`` uses too, so flows sharing a
+wallet (e.g. one gas-sponsoring sender), sync or async, can submit
+concurrently without racing on the nonce. Receipts are polled in one
+JSON-RPC batch per round, like ``TxSubmitter`` does.
+
+    submitter = AsyncTxSubmitter(w3, PRIVATE_KEY)
+    receipt = await submitter.send(await compass_api.earn.earn_manage_async(...))
+
+Unlike ``TxSubmitter`` it does not replace stuck transactions.
+"""
+
+import asyncio
+import time
+
+from eth_account import Account
+from web3 import Web3
+
+from compass_common.nonce_manager import NonceManager
+from compass_common.tx_engine import (
+    TransactionFailed,
+    _is_known,
+    _is_nonce_too_low,
+    mined_hashes,
+    receipt_requests,
+    unsigned_tx,
+)
+
+
+class AsyncTxSubmitter:
+    def __init__(self, w3, private_key, poll_interval=0.5, timeout=120, nonces=None):
+        self.w3 = w3
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        # looked up on first use: the chain id has to be awaited
+        self.nonces = nonces
+        # hashes of transactions carrying an EIP-7702 authorization
+        self._authorizing = set()
+
+    async def _nonces(self):
+        if self.nonces is None:
+            self.nonces = NonceManager.for_wallet(
+                self.w3, self.address, await self.w3.eth.chain_id
+            )
+        return self.nonces
+
+    async def _reserve(self):
+        nonces = await self._nonces()
+        pending_count = None
+        if nonces.needs_count():
+            pending_count = await self.w3.eth.get_transaction_count(
+                self.address, "pending"
+            )
+        return nonces.reserve(pending_count)
+
+    async def resync(self):
+        """Forget the local nonce; the next submission re-reads it from the node."""
+        (await self._nonces()).resync()
+
+    async def submit(self, response, on_signed=None):
+        """Sign and broadcast without waiting for the receipt. Returns the hash.
+
+        ``on_signed`` is called with the hash before the transaction is
+        broadcast, e.g. to persist it so a crash cannot lose it.
+        """
+        tx = unsigned_tx(response)
+        nonce = tx["nonce"] = await self._reserve()
+        signed_tx = self.account.sign_transaction(tx)
+        try:
+            if on_signed is not None:
+                on_signed(Web3.to_hex(signed_tx.hash))
+            tx_hash = Web3.to_hex(
+                await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            )
+        except Exception as e:
+            if _is_known(e):
+                # already in the mempool, so the nonce is spent
+                tx_hash = Web3.to_hex(signed_tx.hash)
+            elif _is_nonce_too_low(e):
+                await self.resync()
+                raise
+            else:
+                self.nonces.release(nonce)
+                raise
+        # tracked like the sync submitter's, so both see what is in flight
+        self.nonces.sent(nonce, tx, signed_tx.raw_transaction, tx_hash)
+        if tx.get("authorizationList"):
+            self._authorizing.add(tx_hash)
+        return tx_hash
+
+    async def submit_many(self, responses):
+        """Send several independent transactions back to back."""
+        return [await self.submit(response) for response in responses]
+
+    async def _mined(self, tx_hashes):
+        if not tx_hashes:
+            return []
+        provider = self.w3.provider
+        if len(tx_hashes) > 1:
+            try:
+                responses = await provider.make_batch_request(
+                    receipt_requests(tx_hashes)
+                )
+            except NotImplementedError:
+                # every async provider has the method, not all of them batch
+                responses = None
+            if isinstance(responses, list):
+                return mined_hashes(tx_hashes, responses)
+        responses = await asyncio.gather(
+            *(provider.make_request(*call) for call in receipt_requests(tx_hashes))
+        )
+        return mined_hashes(tx_hashes, responses)
+
+    async def confirm(self, tx_hashes, raise_on_revert=True):
+        """Wait until all ``tx_hashes`` are mined and return their receipts in order."""
+        tx_hashes = list(tx_hashes)
+        receipts = {}
+        deadline = time.monotonic() + self.timeout
+        while True:
+            waiting = [tx_hash for tx_hash in tx_hashes if tx_hash not in receipts]
+            mined = await self._mined(waiting)
+            found = await asyncio.gather(
+                *(self.w3.eth.get_transaction_receipt(tx_hash) for tx_hash in mined)
+            )
+            receipts.update(zip(mined, found))
+            for tx_hash in mined:
+                nonce = self.nonces.nonce_of(tx_hash)
+                if nonce is not None:
+                    self.nonces.confirmed(nonce)
+            if len(receipts) == len(tx_hashes):
+                break
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"{len(tx_hashes) - len(receipts)} transaction(s) not mined "
+                    f"after {self.timeout}s"
+                )
+            await asyncio.sleep(self.poll_interval)
+
+        if self._authorizing.intersection(tx_hashes):
+            # an authorization signed by the sender bumped its nonce once more
+            self._authorizing.difference_update(tx_hashes)
+            await self.resync()
+        if raise_on_revert:
+            for tx_hash in tx_hashes:
+                if receipts[tx_hash]["status"] != 1:
+                    raise TransactionFailed(tx_hash, receipts[tx_hash])
+        return [receipts[tx_hash] for tx_hash in tx_hashes]
+
+    async def send(self, response, raise_on_revert=True):
+        """Submit a single transaction and wait for its receipt."""
+        [receipt] = await self.confirm([await self.submit(response)], raise_on_revert)
+        return receipt
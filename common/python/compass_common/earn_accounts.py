@@ -0,0 +1,251 @@
+"""Local registry of the Earn Account of each owner, per chain.
+
+The Compass API answers with an owner's Earn Account address in several
+places (``earn_create_account``, ``earn_balances``), but nothing kept it, so
+every script that only knows ``WALLET_ADDRESS`` asked again.
+``EarnAccountRegistry`` stores the address in a SQLite file, together with
+what is known about the account:
+
+- ``KNOWN``: the address came from a response that does not say whether the
+  account is deployed (the address is deterministic, so it is right anyway),
+- ``PENDING``: the create transaction is signed (its hash is recorded before
+  it is broadcast) but not confirmed,
+- ``CREATED``: the create transaction was mined,
+- ``EXISTS``: the API had no create transaction to send, the account was there,
+- ``FAILED``: the create transaction reverted or could not be sent.
+
+``get`` returns the address whatever the status; ``missing`` only treats
+``CREATED`` and ``EXISTS`` as having an account. Both, and the reverse lookup
+``owner_of``, are dictionary lookups in an in-memory copy of the chain's rows,
+loaded once (through the ``(chain, status)`` index), so asking about
+thousands of owners costs no query, let alone an API or RPC call, per owner.
+
+Without a path, the registry lives in ``~/.compass/earn_accounts.sqlite3``, so
+every script of every example on the machine shares it.
+
+    registry = EarnAccountRegistry()
+    registry.record(owner, "base", create_account_response)
+    registry.get(owner, "base")                     # address or None
+    registry.lookup(compass_api, owner, "base")     # asks the API only once
+    for owner, address in registry.sync(compass_api, owners, "base"): ...
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+KNOWN = "known"
+PENDING = "pending"
+CREATED = "created"
+EXISTS = "exists"
+FAILED = "failed"
+
+# statuses that mean the owner has an Earn Account
+ACTIVE = (CREATED, EXISTS)
+
+# shared by every script that does not name its own file
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".compass", "earn_accounts.sqlite3"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS earn_accounts (
+    owner TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    earn_account_address TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tx_hash TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (owner, chain)
+);
+CREATE INDEX IF NOT EXISTS earn_accounts_chain_status
+    ON earn_accounts (chain, status);
+CREATE INDEX IF NOT EXISTS earn_accounts_address
+    ON earn_accounts (earn_account_address);
+"""
+
+
+def _chain(chain):
+    return str(getattr(chain, "value", chain)).lower()
+
+
+class _ChainIndex:
+    """In-memory copy of one chain's rows."""
+
+    def __init__(self, rows):
+        # owner (lowercase) -> (earn account address, status)
+        self.accounts = {}
+        # earn account address (lowercase) -> owner (lowercase)
+        self.owners = {}
+        for owner, address, status in rows:
+            self.put(owner, address, status)
+
+    def put(self, owner, address, status):
+        previous = self.accounts.get(owner)
+        if previous is not None:
+            self.owners.pop(previous[0].lower(), None)
+        self.accounts[owner] = (address, status)
+        self.owners[address.lower()] = owner
+
+
+class EarnAccountRegistry:
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._chains = {}  # chain -> _ChainIndex
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def _index(self, chain):
+        chain = _chain(chain)
+        with self._lock:
+            if chain not in self._chains:
+                rows = self.db.execute(
+                    "SELECT owner, earn_account_address, status FROM earn_accounts "
+                    "WHERE chain = ?",
+                    (chain,),
+                )
+                self._chains[chain] = _ChainIndex(rows.fetchall())
+            return self._chains[chain]
+
+    def get(self, owner, chain):
+        """The owner's Earn Account address, or None if it is not known."""
+        account = self._index(chain).accounts.get(owner.lower())
+        return account[0] if account else None
+
+    def status(self, owner, chain):
+        account = self._index(chain).accounts.get(owner.lower())
+        return account[1] if account else None
+
+    def owner_of(self, earn_account_address, chain):
+        """The (lowercase) owner of an Earn Account, or None."""
+        return self._index(chain).owners.get(earn_account_address.lower())
+
+    def missing(self, owners, chain):
+        """The ``owners`` without a deployed Earn Account on ``chain``, in order."""
+        accounts = self._index(chain).accounts
+        return [
+            owner
+            for owner in owners
+            if accounts.get(owner.lower(), (None, None))[1] not in ACTIVE
+        ]
+
+    def pending(self, chain):
+        """{owner: (earn account address, tx hash)} of the ``PENDING`` rows."""
+        rows = self.db.execute(
+            "SELECT owner, earn_account_address, tx_hash FROM earn_accounts "
+            "WHERE chain = ? AND status = ?",
+            (_chain(chain), PENDING),
+        )
+        return {owner: (address, tx_hash) for owner, address, tx_hash in rows}
+
+    def add(self, owner, chain, earn_account_address, status, tx_hash=None):
+        """Record (or overwrite) the owner's account and its status."""
+        self.add_many(chain, [(owner, earn_account_address, status, tx_hash)])
+
+    def add_many(self, chain, rows):
+        """Record (owner, address, status, tx hash) rows in one transaction."""
+        index = self._index(chain)
+        chain = _chain(chain)
+        now = time.time()
+        rows = [
+            (owner.lower(), chain, address, status, tx_hash, now)
+            for owner, address, status, tx_hash in rows
+        ]
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO earn_accounts "
+                "(owner, chain, earn_account_address, status, tx_hash, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            for owner, _, address, status, _, _ in rows:
+                index.put(owner, address, status)
+
+    def _row(self, owner, chain, response):
+        """The row ``response`` (anything with ``earn_account_address``) implies."""
+        if getattr(response, "transaction", None) is not None:
+            status = PENDING  # a create transaction that is yet to be sent
+        elif hasattr(response, "transaction"):
+            status = EXISTS  # a create response with nothing left to create
+        else:
+            # e.g. balances: says nothing about deployment, keep what we know
+            status = self.status(owner, chain) or KNOWN
+        return (owner, response.earn_account_address, status, None)
+
+    def record(self, owner, chain, response):
+        """Record the Earn Account an API response names; returns its address.
+
+        Works with ``earn_create_account`` (``PENDING`` until the caller
+        records the mined transaction, ``EXISTS`` if there was nothing to
+        create) and ``earn_balances`` responses.
+        """
+        row = self._row(owner, chain, response)
+        self.add_many(chain, [row])
+        return row[1]
+
+    def lookup(self, compass, owner, chain):
+        """The owner's Earn Account address; asks ``earn_balances`` only once."""
+        address = self.get(owner, chain)
+        if address is None:
+            response = compass.earn.earn_balances(chain=chain, owner=owner)
+            address = self.record(owner, chain, response)
+        return address
+
+    def sync(self, compass, owners, chain, max_in_flight=16, batch_size=500):
+        """Fill in the owners the registry does not know yet.
+
+        The ``earn_balances`` calls run ``max_in_flight`` at a time; the
+        (owner, address) pairs are yielded as they arrive and written in
+        batches of ``batch_size``. Owners whose call fails are left out.
+        """
+        todo = [owner for owner in owners if self.get(owner, chain) is None]
+        batch = []
+        with ThreadPoolExecutor(max_in_flight) as pool:
+            futures = {
+                pool.submit(compass.earn.earn_balances, chain=chain, owner=owner): owner
+                for owner in todo
+            }
+            try:
+                for future in as_completed(futures):
+                    if future.exception() is not None:
+                        continue
+                    row = self._row(futures[future], chain, future.result())
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        self.add_many(chain, batch)
+                        batch = []
+                    yield row[0], row[1]
+            finally:
+                if batch:
+                    self.add_many(chain, batch)
+                for future in futures:
+                    future.cancel()
+
+    def counts(self, chain=None):
+        """Number of owners per status (on ``chain`` only, if given)."""
+        if chain is None:
+            rows = self.db.execute(
+                "SELECT status, COUNT(*) FROM earn_accounts GROUP BY status"
+            )
+        else:
+            rows = self.db.execute(
+                "SELECT status, COUNT(*) FROM earn_accounts WHERE chain = ? "
+                "GROUP BY status",
+                (_chain(chain),),
+            )
+        return dict(rows.fetchall())
@@ -0,0 +1,208 @@
+"""Local nonce bookkeeping for one wallet.
+
+Multi-transaction flows used to let every transaction carry the nonce the
+Compass API read from the node, which only works if each transaction is mined
+before the next one is requested. ``NonceManager`` hands out nonces locally
+instead, so transactions can be pipelined, and remembers what it handed out so
+that it can:
+
+- give back a nonce whose transaction never reached the node (``release``),
+  so the next transaction fills the hole instead of leaving a gap behind
+  which everything else would wait forever,
+- notice transactions the node dropped from its mempool (``sync``),
+- spot transactions that have been pending for too long (``stuck``) and build
+  a fee-bumped replacement for them (``replacement``).
+
+There is one manager per wallet and chain in a process (``for_wallet``), so
+every ``TxSubmitter`` and ``AsyncTxSubmitter`` of a wallet, in whichever
+script or thread, shares the same nonce sequence. All methods are
+thread-safe. The manager only makes RPC calls through a synchronous ``Web3``;
+``AsyncWeb3`` callers read the chain id and the transaction count themselves
+and pass them in.
+"""
+
+import heapq
+import threading
+import time
+
+from web3 import AsyncWeb3
+
+# nodes reject a replacement that does not raise the fees by at least 10%
+REPLACEMENT_FEE_BUMP = 1.125
+
+
+class PendingTx:
+    def __init__(self, nonce, tx, raw_transaction, tx_hashes):
+        self.nonce = nonce
+        self.tx = tx
+        self.raw_transaction = raw_transaction
+        # every hash broadcast for this nonce, the latest replacement last
+        self.tx_hashes = tx_hashes
+        self.sent_at = time.monotonic()
+
+
+class NonceManager:
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, w3, address):
+        self.w3 = w3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next_nonce = None
+        self._released = []  # heap of nonces handed out but never broadcast
+        self._reserved = set()  # nonces handed out, not yet sent or released
+        self._pending = {}  # nonce -> PendingTx
+
+    @classmethod
+    def for_wallet(cls, w3, address, chain_id=None):
+        """The shared manager of ``address`` on the chain ``w3`` is connected to.
+
+        With an ``AsyncWeb3``, pass the awaited ``chain_id``.
+        """
+        if chain_id is None:
+            chain_id = w3.eth.chain_id
+        sync_w3 = None if isinstance(w3, AsyncWeb3) else w3
+        key = (chain_id, address.lower())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(sync_w3, address)
+            elif cls._instances[key].w3 is None:
+                cls._instances[key].w3 = sync_w3
+            return cls._instances[key]
+
+    def needs_count(self):
+        """Whether ``reserve`` has to know the node's pending transaction count."""
+        with self._lock:
+            return not self._released and self._next_nonce is None
+
+    def reserve(self, pending_count=None):
+        """Next nonce to use; released nonces are handed out again first.
+
+        ``pending_count`` is the node's pending transaction count, read by the
+        caller; without it the manager reads it when it needs it.
+        """
+        with self._lock:
+            if self._released:
+                nonce = heapq.heappop(self._released)
+                self._reserved.add(nonce)
+                return nonce
+            if self._next_nonce is None:
+                if pending_count is None:
+                    pending_count = self.w3.eth.get_transaction_count(
+                        self.address, "pending"
+                    )
+                self._next_nonce = pending_count
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            self._reserved.add(nonce)
+            return nonce
+
+    def release(self, nonce):
+        """Give back a reserved nonce whose transaction was not broadcast."""
+        with self._lock:
+            self._reserved.discard(nonce)
+            if self._next_nonce is not None and nonce == self._next_nonce - 1:
+                self._next_nonce -= 1
+            else:
+                heapq.heappush(self._released, nonce)
+
+    def sent(self, nonce, tx, raw_transaction, tx_hash):
+        with self._lock:
+            self._reserved.discard(nonce)
+            pending = self._pending.get(nonce)
+            if pending is None:
+                self._pending[nonce] = PendingTx(
+                    nonce, tx, raw_transaction, [tx_hash]
+                )
+            else:
+                # a replacement: the previous hashes may still be the one mined
+                pending.tx = tx
+                pending.raw_transaction = raw_transaction
+                pending.tx_hashes.append(tx_hash)
+                pending.sent_at = time.monotonic()
+
+    def confirmed(self, nonce):
+        """Forget a mined nonce and return its ``PendingTx`` (or None)."""
+        with self._lock:
+            return self._pending.pop(nonce, None)
+
+    def get(self, nonce):
+        with self._lock:
+            return self._pending.get(nonce)
+
+    def nonce_of(self, tx_hash):
+        with self._lock:
+            for pending in self._pending.values():
+                if tx_hash in pending.tx_hashes:
+                    return pending.nonce
+        return None
+
+    def resync(self):
+        """Forget the next nonce; the next ``reserve`` reads it from the node.
+
+        The transactions in flight stay tracked, so ``sync`` still re-broadcasts
+        them and ``stuck`` still finds them. Reservations not sent yet are
+        forgotten as well: the node's count already covers what others used.
+        """
+        with self._lock:
+            self._next_nonce = None
+            self._released = []
+            self._reserved.clear()
+
+    def sync(self):
+        """Reconcile with the node and return the transactions it has lost.
+
+        Mined nonces are forgotten. A tracked transaction at or above the
+        node's pending count is no longer in its mempool: it has to be
+        broadcast again, otherwise every later nonce stays stuck behind it.
+        """
+        latest = self.w3.eth.get_transaction_count(self.address, "latest")
+        pending_count = self.w3.eth.get_transaction_count(self.address, "pending")
+        with self._lock:
+            for nonce in [n for n in self._pending if n < latest]:
+                del self._pending[nonce]
+            self._released = [n for n in self._released if n >= latest]
+            heapq.heapify(self._released)
+            if not self._pending and not self._released and not self._reserved:
+                # nothing of ours in flight or about to be: adopt what other
+                # senders did
+                self._next_nonce = pending_count
+            return sorted(
+                (p for p in self._pending.values() if p.nonce >= pending_count),
+                key=lambda p: p.nonce,
+            )
+
+    def stuck(self, older_than):
+        """Tracked transactions sent (or last replaced) more than ``older_than`` seconds ago."""
+        now = time.monotonic()
+        with self._lock:
+            return sorted(
+                (p for p in self._pending.values() if now - p.sent_at > older_than),
+                key=lambda p: p.nonce,
+            )
+
+    def replacement(self, nonce, bump=REPLACEMENT_FEE_BUMP):
+        """Copy of the pending transaction at ``nonce`` with its fees raised.
+
+        Fees go up by ``bump`` and at least to the current network fees, so
+        the replacement is both accepted by the node and attractive to
+        block builders.
+        """
+        pending = self.get(nonce)
+        if pending is None:
+            raise KeyError(f"no pending transaction with nonce {nonce}")
+        tx = dict(pending.tx)
+        if "maxFeePerGas" in tx:
+            priority = max(
+                int(int(tx["maxPriorityFeePerGas"]) * bump),
+                self.w3.eth.max_priority_fee,
+            )
+            base_fee = self.w3.eth.get_block("latest").get("baseFeePerGas", 0)
+            tx["maxPriorityFeePerGas"] = priority
+            tx["maxFeePerGas"] = max(
+                int(int(tx["maxFeePerGas"]) * bump), 2 * base_fee + priority
+            )
+        else:
+            tx["gasPrice"] = max(int(int(tx["gasPrice"]) * bump), self.w3.eth.gas_price)
+        return tx
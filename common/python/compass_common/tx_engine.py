@@ -0,0 +1,228 @@
+"""Transaction submission engine shared by the use cases.
+
+Every use case used to carry its own ``send_tx``: sign, send, then block on
+``wait_for_transaction_receipt`` before building the next transaction. The
+``TxSubmitter`` here takes nonces from the wallet's shared ``NonceManager``
+so several transactions can be sent back to back, and then confirms all of
+them together, polling their receipts in one JSON-RPC batch per round. While
+waiting it re-broadcasts transactions the node dropped and replaces the ones
+stuck for longer than ``stuck_after`` seconds with a fee-bumped copy.
+
+    submitter = TxSubmitter(w3, PRIVATE_KEY)
+    receipt = submitter.send(compass.swap.swap_odos(...))  # like the old send_tx
+
+    hashes = submitter.submit_many([allowance_tx, other_tx])
+    receipts = submitter.confirm(hashes)
+"""
+
+import time
+
+from eth_account import Account
+from web3 import Web3
+
+from compass_common.nonce_manager import NonceManager
+
+
+class TransactionFailed(Exception):
+    def __init__(self, tx_hash, receipt):
+        super().__init__(f"transaction {tx_hash} reverted")
+        self.tx_hash = tx_hash
+        self.receipt = receipt
+
+
+def unsigned_tx(response):
+    """Return the unsigned transaction dict of a Compass API response.
+
+    Accepts SDK response models with a ``transaction`` field, models that are
+    the transaction themselves, and plain dicts of either shape.
+    """
+    tx = response if isinstance(response, dict) else response.model_dump(by_alias=True)
+    if "transaction" in tx:
+        tx = tx["transaction"]
+        if tx is None:
+            raise ValueError("response does not contain a transaction to send")
+    return dict(tx)
+
+
+def receipt_requests(tx_hashes):
+    """The ``eth_getTransactionReceipt`` calls of one JSON-RPC batch."""
+    return [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes]
+
+
+def mined_hashes(tx_hashes, responses):
+    """The ``tx_hashes`` whose raw receipt response has a result."""
+    return [
+        tx_hash
+        for tx_hash, response in zip(tx_hashes, responses)
+        if response.get("result")
+    ]
+
+
+def _is_known(error):
+    message = str(error).lower()
+    return "already known" in message or "known transaction" in message
+
+
+def _is_nonce_too_low(error):
+    message = str(error).lower()
+    return "nonce too low" in message or "already been used" in message
+
+
+class TxSubmitter:
+    def __init__(
+        self,
+        w3,
+        private_key,
+        poll_interval=0.1,
+        timeout=120,
+        stuck_after=60,
+        nonces=None,
+    ):
+        self.w3 = w3
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        # None disables replacing slow transactions
+        self.stuck_after = stuck_after
+        self.nonces = nonces or NonceManager.for_wallet(w3, self.address)
+
+    def resync(self):
+        """Forget the next nonce; the next submission re-reads it from the node."""
+        self.nonces.resync()
+
+    def _broadcast(self, nonce, tx):
+        signed_tx = self.account.sign_transaction(tx)
+        try:
+            tx_hash = Web3.to_hex(
+                self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            )
+        except Exception as e:
+            if not _is_known(e):
+                raise
+            tx_hash = Web3.to_hex(signed_tx.hash)
+        self.nonces.sent(nonce, tx, signed_tx.raw_transaction, tx_hash)
+        return tx_hash
+
+    def submit(self, response, nonce=None):
+        """Sign and broadcast without waiting for the receipt. Returns the hash.
+
+        ``nonce`` is one the caller already reserved from ``self.nonces``,
+        e.g. to sign an EIP-7702 authorization for the nonce after it.
+        """
+        tx = unsigned_tx(response)
+        # the nonce baked in by the API is stale as soon as another
+        # transaction of this wallet is in flight
+        if nonce is None:
+            nonce = self.nonces.reserve()
+        tx["nonce"] = nonce
+        try:
+            return self._broadcast(nonce, tx)
+        except Exception as e:
+            if _is_nonce_too_low(e):
+                # someone else used it: start over from the node's view
+                self.resync()
+            else:
+                # not broadcast, so the nonce must be reused to avoid a gap
+                self.nonces.release(nonce)
+            raise
+
+    def recover(self):
+        """Re-broadcast dropped transactions and replace stuck ones.
+
+        Returns the hashes of the replacements that were sent.
+        """
+        for pending in self.nonces.sync():
+            try:
+                self.w3.eth.send_raw_transaction(pending.raw_transaction)
+            except Exception as e:
+                if not (_is_known(e) or _is_nonce_too_low(e)):
+                    raise
+        if self.stuck_after is None:
+            return []
+        return [
+            self._broadcast(pending.nonce, self.nonces.replacement(pending.nonce))
+            for pending in self.nonces.stuck(self.stuck_after)
+        ]
+
+    def submit_many(self, responses):
+        """Send several independent transactions back to back."""
+        return [self.submit(response) for response in responses]
+
+    def _settle(self, nonce):
+        pending = self.nonces.confirmed(nonce)
+        if pending is not None and pending.tx.get("authorizationList"):
+            # an EIP-7702 authorization signed by the sender bumps its nonce
+            # once more when the transaction is mined
+            self.nonces.sync()
+
+    def _candidates(self, tx_hash):
+        # a replaced transaction may be mined under any of its hashes
+        nonce = self.nonces.nonce_of(tx_hash)
+        if nonce is None:
+            return nonce, [tx_hash]
+        pending = self.nonces.get(nonce)
+        return nonce, list(pending.tx_hashes) if pending else [tx_hash]
+
+    def confirm(self, tx_hashes, raise_on_revert=True):
+        """Wait until all ``tx_hashes`` are mined and return their receipts in order.
+
+        The receipt of a transaction that was replaced is the receipt of
+        whichever of its versions was mined.
+        """
+        tx_hashes = list(tx_hashes)
+        candidates = {tx_hash: self._candidates(tx_hash) for tx_hash in tx_hashes}
+        receipts = {}
+        deadline = time.monotonic() + self.timeout
+        next_recovery = time.monotonic() + (self.stuck_after or self.timeout)
+        while True:
+            waiting = {h: candidates[h] for h in tx_hashes if h not in receipts}
+            mined = set(
+                self._mined([c for _, hashes in waiting.values() for c in hashes])
+            )
+            for tx_hash, (nonce, hashes) in waiting.items():
+                for candidate in hashes:
+                    if candidate in mined:
+                        receipts[tx_hash] = self.w3.eth.get_transaction_receipt(
+                            candidate
+                        )
+                        if nonce is not None:
+                            self._settle(nonce)
+                        break
+            if len(receipts) == len(tx_hashes):
+                break
+            now = time.monotonic()
+            if now >= deadline:
+                raise TimeoutError(
+                    f"{len(tx_hashes) - len(receipts)} transaction(s) not mined "
+                    f"after {self.timeout}s"
+                )
+            if now >= next_recovery:
+                self.recover()
+                candidates = {h: self._candidates(h) for h in tx_hashes}
+                next_recovery = now + (self.stuck_after or self.timeout)
+            time.sleep(self.poll_interval)
+
+        if raise_on_revert:
+            for tx_hash in tx_hashes:
+                if receipts[tx_hash]["status"] != 1:
+                    raise TransactionFailed(tx_hash, receipts[tx_hash])
+        return [receipts[tx_hash] for tx_hash in tx_hashes]
+
+    def _mined(self, tx_hashes):
+        if not tx_hashes:
+            return []
+        provider = self.w3.provider
+        if len(tx_hashes) > 1 and hasattr(provider, "make_batch_request"):
+            responses = provider.make_batch_request(receipt_requests(tx_hashes))
+            if isinstance(responses, list):
+                return mined_hashes(tx_hashes, responses)
+        responses = [
+            provider.make_request(*call) for call in receipt_requests(tx_hashes)
+        ]
+        return mined_hashes(tx_hashes, responses)
+
+    def send(self, response, raise_on_revert=True, nonce=None):
+        """Submit a single transaction and wait for its receipt."""
+        [receipt] = self.confirm([self.submit(response, nonce)], raise_on_revert)
+        return receipt
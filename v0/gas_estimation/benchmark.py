@@ -0,0 +1,213 @@
+"""Benchmark and regression check over stored gas reports.
+
+Loads any number of ``gas_estimation_report__*.json`` reports (or the
+``.ndjson`` run files next to them), flattens every step into one pandas
+frame and computes, fully vectorized:
+
+- per-step gas distributions for the sequential and the bundler path,
+- the gas saved by bundling, per report and overall,
+- estimate accuracy (``estimated_gas`` / ``used_gas``),
+- regressions: steps whose mean gas grew by more than a threshold between
+  consecutive SDK versions (taken from the report's ``meta`` record; reports
+  written before it existed are grouped as ``unknown``).
+
+Dry runs (``meta.dry_run``) simulate instead of mining, so every table keeps
+them apart from the executed runs.
+
+    python benchmark.py gas_usage_reports/*.json
+    python benchmark.py --threshold 0.01 --json benchmark.json gas_usage_reports/
+"""
+
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from report_writer import load_report
+
+PATHS = {"sequential_requests": "sequential", "bundler_requests": "bundler"}
+COLUMNS = ["step", "function", "estimated_gas", "used_gas", "tx_receipt_status"]
+
+
+def expand(paths):
+    """The report files in ``paths``; directories are searched for gas reports.
+
+    A run leaves a ``.json`` report and its ``.ndjson`` run file side by side;
+    only the ``.json`` of such a pair is loaded.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            runs = {}  # stem -> file
+            for file in sorted(
+                glob.glob(os.path.join(path, "gas_estimation_report__*.*json"))
+            ):
+                stem, extension = os.path.splitext(file)
+                if extension == ".json" or stem not in runs:
+                    runs[stem] = file
+            files.extend(runs.values())
+        else:
+            files.append(path)
+    return files
+
+
+def load_reports(paths):
+    """One row per executed step across all reports.
+
+    Values are gathered into plain column lists and turned into a frame in a
+    single step, which keeps loading thousands of reports fast.
+    """
+    columns = {name: [] for name in ["report", "version", "dry_run", "path", *COLUMNS]}
+    for file in expand(paths):
+        if file.endswith(".ndjson"):
+            report = load_report(file)
+        else:
+            with open(file) as f:
+                report = json.load(f)
+        meta = (report.get("meta") or [{}])[0]
+        version = meta.get("sdk_version", "unknown")
+        dry_run = bool(meta.get("dry_run", False))
+        name = os.path.basename(file)
+        for section, path in PATHS.items():
+            records = report.get(section, [])
+            columns["report"].extend([name] * len(records))
+            columns["version"].extend([version] * len(records))
+            columns["dry_run"].extend([dry_run] * len(records))
+            columns["path"].extend([path] * len(records))
+            for column in COLUMNS:
+                columns[column].extend(record.get(column) for record in records)
+
+    df = pd.DataFrame(columns)
+    for column in ("estimated_gas", "used_gas"):
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+def gas_distributions(df):
+    grouped = df.groupby(["dry_run", "path", "step", "function"])["used_gas"]
+    return grouped.describe(percentiles=[0.5, 0.95]).rename(
+        columns={"50%": "p50", "95%": "p95"}
+    )
+
+
+def bundling_savings(df):
+    totals = df.pivot_table(
+        index=["dry_run", "report"], columns="path", values="used_gas", aggfunc="sum"
+    )
+    if not {"bundler", "sequential"} <= set(totals.columns):
+        # no report has both paths, so there is nothing to compare
+        return pd.DataFrame(
+            columns=["bundler", "sequential", "saving_percent", "ratio"]
+        )
+    totals = totals.dropna()
+    totals["saving_percent"] = 100 * (1 - totals["bundler"] / totals["sequential"])
+    totals["ratio"] = totals["sequential"] / totals["bundler"]
+    return totals
+
+
+def estimate_accuracy(df):
+    accuracy = df[["dry_run", "path", "function"]].copy()
+    accuracy["ratio"] = df["estimated_gas"] / df["used_gas"]
+    accuracy["underestimated"] = np.where(accuracy["ratio"] < 1, 1.0, 0.0)
+    accuracy = accuracy.dropna(subset=["ratio"])
+    return accuracy.groupby(["dry_run", "path", "function"]).agg(
+        mean_ratio=("ratio", "mean"),
+        min_ratio=("ratio", "min"),
+        max_ratio=("ratio", "max"),
+        underestimated_share=("underestimated", "mean"),
+    )
+
+
+def regressions(df, threshold=0.02):
+    """Steps whose mean ``used_gas`` grew by more than ``threshold`` between
+    consecutive versions (in order of first appearance in the data).
+
+    Dry runs are only compared with dry runs, executed runs with executed runs.
+    """
+    found = [
+        _regressions(runs, threshold).assign(dry_run=dry_run)
+        for dry_run, runs in df.groupby("dry_run")
+    ]
+    columns = ["dry_run", "path", "step", "function", "from", "to", "change"]
+    if not found:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(found, ignore_index=True)[columns]
+
+
+def _regressions(df, threshold):
+    versions = list(dict.fromkeys(df["version"]))
+    if len(versions) < 2:
+        return pd.DataFrame(
+            columns=["path", "step", "function", "from", "to", "change"]
+        )
+
+    means = df.pivot_table(
+        index=["path", "step", "function"],
+        columns="version",
+        values="used_gas",
+        aggfunc="mean",
+    )[versions]
+    previous = means.iloc[:, :-1].to_numpy()
+    current = means.iloc[:, 1:].to_numpy()
+    change = (current - previous) / previous
+
+    rows, cols = np.nonzero(np.nan_to_num(change, nan=0.0) > threshold)
+    return pd.DataFrame(
+        {
+            "path": means.index.get_level_values("path")[rows],
+            "step": means.index.get_level_values("step")[rows],
+            "function": means.index.get_level_values("function")[rows],
+            "from": np.array(versions[:-1])[cols],
+            "to": np.array(versions[1:])[cols],
+            "change": change[rows, cols],
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="report files or directories")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.02,
+        help="relative gas increase flagged as a regression (default: 0.02)",
+    )
+    parser.add_argument("--json", help="also write all tables to this JSON file")
+    args = parser.parse_args()
+
+    df = load_reports(args.paths)
+    tables = {
+        "gas_distributions": gas_distributions(df),
+        "bundling_savings": bundling_savings(df),
+        "estimate_accuracy": estimate_accuracy(df),
+        "regressions": regressions(df, args.threshold),
+    }
+
+    print(f"{df['report'].nunique()} reports, {len(df)} steps\n")
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        for name, table in tables.items():
+            print(f"== {name} ==")
+            print(table if len(table) else "(none)")
+            print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    name: json.loads(table.reset_index().to_json(orient="records"))
+                    for name, table in tables.items()
+                },
+                f,
+                indent=2,
+            )
+
+    if len(tables["regressions"]):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
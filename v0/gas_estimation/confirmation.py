@@ -0,0 +1,75 @@
+"""Confirmation strategies used after a transaction receipt is available.
+
+The gas report used to ``time.sleep(5)`` after every receipt so that the
+following snapshot would see the new state. Instead, pick one of:
+
+- ``none``: the receipt is enough, do not wait any longer.
+- ``confirmations:N``: wait until the receipt's block has N confirmations
+  (the block containing the transaction counts as the first one).
+- ``state_visible``: re-read a probe through the Compass API until it differs
+  from the value read before the transaction was sent, i.e. until the API
+  serves state that includes the new block.
+
+Every strategy reports how long it actually waited.
+"""
+
+import time
+
+
+class ConfirmationStrategy:
+    MODES = ("none", "confirmations", "state_visible")
+
+    def __init__(self, mode="none", confirmations=1, poll_interval=0.1, timeout=30.0):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown confirmation strategy: {mode}")
+        if confirmations < 1:
+            raise ValueError("confirmations must be at least 1")
+        self.mode = mode
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    @classmethod
+    def parse(cls, spec, **kwargs):
+        """Build a strategy from ``none``, ``state_visible`` or ``confirmations:N``."""
+        mode, _, arg = spec.strip().partition(":")
+        if mode == "confirmations":
+            return cls(mode, confirmations=int(arg or 1), **kwargs)
+        return cls(mode, **kwargs)
+
+    def __str__(self):
+        if self.mode == "confirmations":
+            return f"confirmations:{self.confirmations}"
+        return self.mode
+
+    def wait(self, w3, receipt, probe=None, baseline=None):
+        """Wait according to the strategy and return a record of the wait.
+
+        ``probe`` and ``baseline`` are only used by ``state_visible``: ``probe()``
+        is polled until its result differs from ``baseline``.
+        """
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        timed_out = False
+
+        if self.mode == "confirmations":
+            target = receipt["blockNumber"] + self.confirmations - 1
+            while w3.eth.block_number < target:
+                if time.perf_counter() >= deadline:
+                    timed_out = True
+                    break
+                time.sleep(self.poll_interval)
+        elif self.mode == "state_visible":
+            if probe is None:
+                raise ValueError("state_visible needs a probe")
+            while probe() == baseline:
+                if time.perf_counter() >= deadline:
+                    timed_out = True
+                    break
+                time.sleep(self.poll_interval)
+
+        return {
+            "strategy": str(self),
+            "waited_seconds": round(time.perf_counter() - start, 4),
+            "timed_out": timed_out,
+        }
@@ -1,17 +1,42 @@
 import os
 import json
+from importlib.metadata import version
 from dotenv import load_dotenv
 from web3 import Web3, HTTPProvider
 
 from compass_api_sdk import CompassAPI, models
-import time
+from compass_common import AllowancePlanner, AllowanceReader, TxSubmitter
 
 from datetime import datetime
+from decimal import Decimal
 from compass_api_sdk.models import TokenEnum
 from eth_account import Account
 import devtools
 import webbrowser
 
+from confirmation import ConfirmationStrategy
+from report_writer import (
+    ReportWriter,
+    export_csv,
+    export_parquet,
+    iter_records,
+    load_report,
+)
+from simulation import (
+    authorization_gas,
+    simulate_batch,
+    simulate_sequence,
+    state_overrides,
+    to_call,
+)
+from snapshot import SnapshotEngine
+from trace_analyzer import (
+    attribute_actions,
+    compare_with_sequential,
+    opcode_gas,
+    stream_struct_logs,
+)
+
 
 # Load environment variables
 load_dotenv()
@@ -20,6 +45,21 @@ PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 COMPASS_API_KEY = os.getenv("COMPASS_API_KEY")
 WALLET = os.getenv("WALLET")
 RPC_URL = BASE_MAINNET_RPC_URL
+# none | state_visible | confirmations:N  (see confirmation.py)
+CONFIRMATION = ConfirmationStrategy.parse(
+    os.getenv("CONFIRMATION_STRATEGY", "state_visible")
+)
+# estimate and trace every step against pending state without sending anything
+DRY_RUN = os.getenv("DRY_RUN", "").lower() in ("1", "true", "yes")
+# also stream a structLog trace of the bundle and break its gas down per opcode
+OPCODE_BREAKDOWN = os.getenv("OPCODE_BREAKDOWN", "").lower() in ("1", "true", "yes")
+# leave out the SET_ALLOWANCE steps whose allowance is already high enough; off
+# by default since the report measures the gas of the approvals as well
+SKIP_SATISFIED_ALLOWANCES = os.getenv("SKIP_SATISFIED_ALLOWANCES", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 
 # Configuration
@@ -37,35 +77,38 @@ filename = (
     + ".json"
 )
 OUTPUT_PATH = os.path.join(SCRIPT_DIR, filename)
+# every record is appended here as soon as it is collected; point this at the
+# file of an interrupted run to resume it
+RUN_PATH = os.getenv("REPORT_RUN_PATH") or OUTPUT_PATH.removesuffix(".json") + ".ndjson"
+# csv | parquet: also export the run as one flat row per record
+REPORT_EXPORT = os.getenv("REPORT_EXPORT", "")
 
 
 # Clients
 w3 = Web3(HTTPProvider(RPC_URL))
 compass = CompassAPI(api_key_auth=COMPASS_API_KEY)
+allowance_reader = AllowanceReader(w3, compass, CHAIN, server_url=SERVER_URL)
+snapshots = SnapshotEngine(compass, CHAIN, WALLET, TOKENS, server_url=SERVER_URL)
+allowance_planner = AllowancePlanner(allowance_reader, WALLET)
+submitter = TxSubmitter(w3, PRIVATE_KEY)
 
-# This will accumulate everything
-output_data = {
-    "sequential_requests": [],
-    "sequential_gas_totals": [],
-    "bundler_requests": [],
-    "bundler_gas_totals": [],
-}
+# NDJSON writer of the running experiment, see run_experiment()
+writer = None
 
 
 # Helpers
 def send_tx(response):
-    tx = response.model_dump(by_alias=True)
-    signed_tx = w3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction).hex()
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    # reverted transactions are recorded with their status, not raised
+    receipt = submitter.send(response, raise_on_revert=False)
     # convert receipt to a serializable dict
-    return tx_hash, dict(receipt)
+    return receipt["transactionHash"].hex(), dict(receipt)
 
 
 def collect(section, data):
-    """Append a record to output_data at output_data[section]."""
-    output_data[section].append(data)
+    """Append a record for ``section`` to the run file and flush it to disk."""
+    writer.append(section, data)
     print({section: data})
+    return data
 
 
 def open_tx_hash_on_basescan(hash: str):
@@ -75,41 +118,59 @@ def open_tx_hash_on_basescan(hash: str):
 
 # Data-gathering functions
 def get_aave_metrics():
-    pos = compass.aave_v3.user_position_per_token(
-        chain=CHAIN,
-        user=WALLET,
-        token=models.AaveUserPositionPerTokenToken.USDC,
-        server_url=SERVER_URL,
-    )
-    summary = compass.aave_v3.user_position_summary(
-        chain=CHAIN, user=WALLET, server_url=SERVER_URL
-    )
-    return {
-        "Collateral": summary.total_collateral,
-        "Debt": summary.total_debt,
-        "ATokenBalance": pos.token_balance,
-        "HealthFactor": summary.health_factor,
-        "LiquidationThreshold": summary.liquidation_threshold,
-    }
+    return snapshots.collect("aave_metrics")[0]["aave_metrics"]
 
 
 def get_portfolio():
-    return {
-        token: compass.token.balance(
-            chain=CHAIN, user=WALLET, token=token, server_url=SERVER_URL
-        ).amount
-        for token in TOKENS + ["ETH"]
-    }
+    return snapshots.collect("portfolio")[0]["portfolio"]
 
 
 def get_allowances():
-    pool = models.GenericAllowanceContractEnum.AAVE_V3_POOL
-    return {
-        token: compass.universal.allowance(
-            chain=CHAIN, user=WALLET, token=token, contract=pool, server_url=SERVER_URL
-        ).amount
-        for token in TOKENS
-    }
+    return snapshots.collect("allowances")[0]["allowances"]
+
+
+def get_eth_balance():
+    return compass.token.balance(
+        chain=CHAIN, user=WALLET, token=ETH, server_url=SERVER_URL
+    ).amount
+
+
+def confirm(receipt, eth_balance_before):
+    # every transaction pays gas, so the sender's ETH balance is a probe that
+    # changes once the Compass API serves the block holding the receipt
+    return CONFIRMATION.wait(
+        w3, receipt, probe=get_eth_balance, baseline=eth_balance_before
+    )
+
+
+def needed_bundler_actions(actions):
+    """``actions`` with the SET_ALLOWANCE operations cut down to the missing ones."""
+    if not SKIP_SATISFIED_ALLOWANCES:
+        return actions
+    is_allowance = [isinstance(op.body, models.SetAllowanceParams) for op in actions]
+    requirements = [
+        (op.body.token, op.body.contract, op.body.amount)
+        for op, allowance in zip(actions, is_allowance)
+        if allowance
+    ]
+    return allowance_planner.operations(requirements) + [
+        op for op, allowance in zip(actions, is_allowance) if not allowance
+    ]
+
+
+def allowance_satisfied(fn, req):
+    """Whether a sequential ``allowance_set`` step can be skipped."""
+    return (
+        SKIP_SATISFIED_ALLOWANCES
+        and fn.__name__ == "allowance_set"
+        and not allowance_planner.missing([(req.token, req.contract, req.amount)])
+    )
+
+
+def get_snapshot():
+    """Portfolio, Aave metrics and allowances fetched concurrently, plus per-call timings."""
+    snapshot, timings = snapshots.collect()
+    return {**snapshot, "snapshot_timings": timings}
 
 
 non_multicall_request_list = [
@@ -309,7 +370,142 @@ request_list_bundler = [
 ]
 
 
-def process_bundler_requests():
+def build_request_lists(actions):
+    """Build matching sequential and bundler request lists from action specs.
+
+    Each action is a dict with an ``ACTION_TYPE`` (as used by the bundler) and
+    its parameters, e.g. ``{"ACTION_TYPE": "AAVE_SUPPLY", "token": "USDC",
+    "amount": "2"}``. Returns ``(non_multicall_request_list,
+    request_list_bundler)`` in the same shape as the module-level defaults.
+    """
+    sequential, bundler = [], []
+    for action in actions:
+        action_type = action["ACTION_TYPE"]
+        amount = str(action["amount"])
+        if action_type == "SET_ALLOWANCE":
+            sequential.append(
+                (
+                    compass.universal.allowance_set,
+                    models.SetAllowanceRequest(
+                        token=action["token"],
+                        contract=action["contract"],
+                        amount=amount,
+                        chain=CHAIN,
+                        sender=WALLET,
+                    ),
+                )
+            )
+            body = models.SetAllowanceParams(
+                ACTION_TYPE=action_type,
+                token=action["token"],
+                contract=action["contract"],
+                amount=amount,
+            )
+        elif action_type == "AAVE_SUPPLY":
+            sequential.append(
+                (
+                    compass.aave_v3.supply,
+                    models.AaveSupplyRequest(
+                        token=action["token"], amount=amount, chain=CHAIN, sender=WALLET
+                    ),
+                )
+            )
+            body = models.AaveSupplyParams(
+                ACTION_TYPE=action_type,
+                token=action["token"],
+                on_behalf_of=WALLET,
+                amount=amount,
+            )
+        elif action_type == "AAVE_BORROW":
+            sequential.append(
+                (
+                    compass.aave_v3.borrow,
+                    models.AaveBorrowRequest(
+                        token=action["token"],
+                        amount=amount,
+                        chain=CHAIN,
+                        sender=WALLET,
+                        interest_rate_mode=INTEREST_RATE_MODE,
+                        on_behalf_of=WALLET,
+                    ),
+                )
+            )
+            body = models.AaveBorrowParams(
+                token=action["token"],
+                amount=amount,
+                interest_rate_mode=INTEREST_RATE_MODE,
+                ACTION_TYPE=action_type,
+                on_behalf_of=WALLET,
+            )
+        elif action_type == "AAVE_REPAY":
+            sequential.append(
+                (
+                    compass.aave_v3.repay,
+                    models.AaveRepayRequest(
+                        token=action["token"],
+                        amount=amount,
+                        chain=CHAIN,
+                        sender=WALLET,
+                        interest_rate_mode=INTEREST_RATE_MODE,
+                    ),
+                )
+            )
+            body = models.AaveRepayParams(
+                token=action["token"],
+                amount=amount,
+                interest_rate_mode=INTEREST_RATE_MODE,
+                ACTION_TYPE=action_type,
+                on_behalf_of=WALLET,
+            )
+        elif action_type == "AAVE_WITHDRAW":
+            sequential.append(
+                (
+                    compass.aave_v3.withdraw,
+                    models.AaveWithdrawRequest(
+                        token=action["token"],
+                        amount=amount,
+                        chain=CHAIN,
+                        sender=WALLET,
+                        recipient=WALLET,
+                    ),
+                )
+            )
+            body = models.AaveWithdrawParams(
+                token=action["token"],
+                amount=amount,
+                recipient=WALLET,
+                ACTION_TYPE=action_type,
+            )
+        elif action_type in ("UNISWAP_SELL_EXACTLY", "UNISWAP_BUY_EXACTLY"):
+            swap = {
+                "token_in": action["token_in"],
+                "token_out": action["token_out"],
+                "fee": action.get("fee", FEE),
+                "amount": amount,
+                "max_slippage_percent": str(action.get("max_slippage_percent", "0.2")),
+            }
+            fn = (
+                compass.uniswap_v3.swap_sell_exactly
+                if action_type == "UNISWAP_SELL_EXACTLY"
+                else compass.uniswap_v3.swap_buy_exactly
+            )
+            sequential.append(
+                (fn, models.UniswapSellExactlyRequest(**swap, chain=CHAIN, sender=WALLET))
+            )
+            params = (
+                models.UniswapSellExactlyParams
+                if action_type == "UNISWAP_SELL_EXACTLY"
+                else models.UniswapBuyExactlyParams
+            )
+            body = params(**swap, ACTION_TYPE=action_type, wrap_eth=False)
+        else:
+            raise ValueError(f"unsupported ACTION_TYPE: {action_type}")
+        bundler.append(models.UserOperation(body=body))
+    return sequential, bundler
+
+
+def build_bundle():
+    """Return the unsigned bundler transaction and the authorization dict."""
     # First get the authorization
     account = Account.from_key(PRIVATE_KEY)
 
@@ -333,36 +529,88 @@ def process_bundler_requests():
         sender=sender,
         signed_authorization=signed_authorization,
         # actions = actions,
-        actions=request_list_bundler,
+        actions=needed_bundler_actions(request_list_bundler),
         server_url=SERVER_URL,
     )
 
+    return response, auth_dict
+
+
+def bundle_gas_attribution(tx, delegate):
+    """Per-action gas of the bundle, traced before it is sent; None on RPC errors."""
+    call = to_call(tx)
+    # the wallet may not be delegated yet: install the delegation for the trace
+    trace = w3.provider.make_request(
+        "debug_traceCall",
+        [
+            call,
+            "latest",
+            {
+                "tracer": "callTracer",
+                "stateOverrides": state_overrides(call["from"], delegate),
+            },
+        ],
+    )
+    if "error" in trace or "result" not in trace:
+        print(f"debug_traceCall failed, no gas attribution: {trace.get('error')}")
+        return None
+    return attribute_actions(trace["result"], authorization_gas(tx))
+
+
+def bundle_opcode_gas(tx, delegate):
+    if not OPCODE_BREAKDOWN:
+        return {}
+    call = to_call(tx)
+    struct_logs = stream_struct_logs(
+        RPC_URL, call, state_overrides=state_overrides(call["from"], delegate)
+    )
+    try:
+        return {"opcode_gas": opcode_gas(struct_logs)}
+    except RuntimeError as e:
+        print(f"{e}, no opcode breakdown")
+        return {}
+
+
+def repay_params(req, debt):
+    """Params of a sequential repay sized to the whole ``debt``."""
+    return models.AaveRepayRequest(
+        token=req.token,
+        amount=debt,
+        chain=CHAIN,
+        sender=WALLET,
+        interest_rate_mode=INTEREST_RATE_MODE,
+    ).model_dump()
+
+
+def build_sequential_tx(fn, params):
+    params.pop("ACTION_TYPE", None)
+    params["server_url"] = SERVER_URL
+    return fn(**params)
+
+
+def process_bundler_requests():
+    if writer.is_done("bundler_requests"):
+        return
+    response, auth_dict = build_bundle()
     unsigned_transaction = response.model_dump(by_alias=True)
     print(f"UNSIGNED_TRANSACTION: {unsigned_transaction}")
     devtools.debug(unsigned_transaction["nonce"])
 
     gas_estimation = w3.eth.estimate_gas(response.model_dump(by_alias=True))
-    trace = w3.provider.make_request(
-        "debug_traceCall", [response.model_dump(by_alias=True), "latest", {}]
-    )
-    # print(trace)
-    # used_gas = trace["result"]["gas"]
+    gas_attribution = bundle_gas_attribution(unsigned_transaction, auth_dict["address"])
+    opcode_breakdown = bundle_opcode_gas(unsigned_transaction, auth_dict["address"])
     print(f"GAS ESTIMATION: {gas_estimation}")
     # print(f"GAS USDED: {used_gas}")
 
-    signed_transaction = w3.eth.account.sign_transaction(
-        unsigned_transaction, PRIVATE_KEY
-    )
-    print(signed_transaction)
-    txn_hash = w3.eth.send_raw_transaction(signed_transaction.raw_transaction)
-    print(txn_hash.hex())
-    # open_tx_hash_on_basescan(txn_hash.hex())
+    eth_balance_before = get_eth_balance()
+    txn_hash, receipt = send_tx(response)
+    print(txn_hash)
+    # open_tx_hash_on_basescan(txn_hash)
     # w3.provider.make_request(RPCEndpoint("evm_mine"), [])
-    receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
     print("-----RECEIPT------")
     print(receipt)
 
-    time.sleep(5)
+    confirmation = confirm(receipt, eth_balance_before)
     # trace = w3.provider.make_request(
     #     "debug_traceCall", [response.model_dump(by_alias=True), "latest", {}]
     # )
@@ -377,12 +625,13 @@ def process_bundler_requests():
             "function": "Bundler Bundle",
             "estimated_gas": gas_estimation,
             "used_gas": used_gas,
-            "tx_hash": txn_hash.hex(),
+            "tx_hash": txn_hash,
             # "TxReceipt": receipt,
             "tx_receipt_status": receipt["status"],
-            "portfolio": get_portfolio(),
-            "aave_metrics": get_aave_metrics(),
-            "allowances": get_allowances(),
+            "confirmation": confirmation,
+            "gas_attribution": gas_attribution,
+            **opcode_breakdown,
+            **get_snapshot(),
         },
     )
 
@@ -390,18 +639,18 @@ def process_bundler_requests():
 # Sequential processing of DeFi actions
 def process_sequential_requests():
     tasks = non_multicall_request_list
+    eth_balance_before = get_eth_balance()
 
     for idx, (fn, req) in enumerate(tasks, start=1):
+        if writer.is_done("sequential_requests", idx):
+            continue
+        if allowance_satisfied(fn, req):
+            devtools.debug(f"step {idx}: allowance already set, skipped")
+            continue
         devtools.debug(fn.__name__)
         if fn.__name__ == "repay":
             devtools.debug("IF STATEMENT TRIGGERED")
-            params = models.AaveRepayRequest(
-                token=TokenEnum.GHO,
-                amount=get_aave_metrics()["Debt"],
-                chain=CHAIN,
-                sender=WALLET,
-                interest_rate_mode=INTEREST_RATE_MODE,
-            ).model_dump()
+            params = repay_params(req, get_aave_metrics()["Debt"])
             devtools.debug(params)
 
         else:
@@ -409,19 +658,17 @@ def process_sequential_requests():
             devtools.debug(params)
 
         # w3.provider.make_request(RPCEndpoint("evm_mine"), [])
-        params.pop("ACTION_TYPE", None)
-        params["server_url"] = SERVER_URL
-        response = fn(**params)
+        response = build_sequential_tx(fn, params)
         gas_est = w3.eth.estimate_gas(response.model_dump(by_alias=True))
         tx_hash, receipt = send_tx(response)
-        time.sleep(5)
+        confirmation = confirm(receipt, eth_balance_before)
         # trace = w3.provider.make_request(
         #     "debug_traceCall", [response.model_dump(by_alias=True), "latest", {}]
         # )
         # used_gas = trace["result"]["gas"]
         used_gas = receipt["gasUsed"]
 
-        collect(
+        record = collect(
             "sequential_requests",
             {
                 "step": idx,
@@ -432,55 +679,190 @@ def process_sequential_requests():
                 "tx_hash": tx_hash,
                 # "TxReceipt": receipt,
                 "tx_receipt_status": receipt["status"],
-                "portfolio": get_portfolio(),
-                "aave_metrics": get_aave_metrics(),
-                "allowances": get_allowances(),
+                "confirmation": confirmation,
+                **get_snapshot(),
             },
         )
+        eth_balance_before = record["portfolio"][ETH]
 
 
-if __name__ == "__main__":
-    devtools.debug(get_aave_metrics())
-    devtools.debug(get_portfolio())
-    devtools.debug(get_allowances())
+def collect_simulation(section, step, function, result, snapshot, **extra):
+    collect(
+        section,
+        {
+            "step": step,
+            "time_stamp": datetime.now().isoformat(),
+            "function": function,
+            "estimated_gas": result["estimated_gas"],
+            "used_gas": result["used_gas"],
+            "tx_hash": None,
+            "tx_receipt_status": 0 if result["error"] else 1,
+            "error": result["error"],
+            **extra,
+            **snapshot,
+        },
+    )
 
-    # run experiment
-    process_bundler_requests()
-    time.sleep(5)
-    process_sequential_requests()
 
-    devtools.debug(get_aave_metrics())
-    devtools.debug(get_portfolio())
-    devtools.debug(get_allowances())
+def simulate_bundler_requests(snapshot):
+    if writer.is_done("bundler_requests"):
+        return
+    response, auth_dict = build_bundle()
+    tx = response.model_dump(by_alias=True)
+    [result] = simulate_batch(w3, [tx], delegate=auth_dict["address"])
+    collect_simulation(
+        "bundler_requests",
+        1,
+        "Bundler Bundle",
+        result,
+        snapshot,
+        gas_attribution=attribute_actions(result["trace"], authorization_gas(tx)),
+    )
+
+
+def simulate_sequential_requests(snapshot):
+    # every step is simulated on top of the ones before it, so the steps a
+    # resumed run already recorded are simulated again, just not collected
+    tasks = [
+        (idx, fn, req)
+        for idx, (fn, req) in enumerate(non_multicall_request_list, start=1)
+        if not allowance_satisfied(fn, req)
+    ]
+    if all(writer.is_done("sequential_requests", idx) for idx, _, _ in tasks):
+        return
+    # nothing is mined, so the debt to repay is the snapshot's plus what the
+    # borrow steps before the repay add to it
+    debt = Decimal(str(snapshot["aave_metrics"]["Debt"]))
+    params = []
+    for _, fn, req in tasks:
+        if fn.__name__ == "repay":
+            params.append(repay_params(req, str(debt)))
+        else:
+            if fn.__name__ == "borrow":
+                debt += Decimal(str(req.amount))
+            params.append(req.model_dump())
+    # building the unsigned transactions is independent per step
+    responses = list(
+        snapshots.executor.map(
+            lambda task, params: build_sequential_tx(task[1], params), tasks, params
+        )
+    )
+    results = simulate_sequence(w3, [r.model_dump(by_alias=True) for r in responses])
+    for (idx, fn, _), result in zip(tasks, results):
+        if not writer.is_done("sequential_requests", idx):
+            collect_simulation(
+                "sequential_requests", idx, fn.__name__, result, snapshot
+            )
+
+
+def run_experiment(run_path=RUN_PATH):
+    """Run the bundler and the sequential experiment and add the gas totals.
+
+    Records are appended to ``run_path`` as they are produced. If the file
+    already holds records of an interrupted run, the steps found there are
+    skipped. Returns the full report rebuilt from the file.
+    """
+    global writer
+    with ReportWriter(run_path) as writer:
+        if not writer.is_done("meta"):
+            # lets benchmark.py group runs and flag regressions per SDK/API version
+            collect(
+                "meta",
+                {
+                    "time_stamp": datetime.now().isoformat(),
+                    "sdk_version": version("compass-api-sdk"),
+                    "server_url": SERVER_URL,
+                    "chain": CHAIN,
+                    "dry_run": DRY_RUN,
+                    "skip_satisfied_allowances": SKIP_SATISFIED_ALLOWANCES,
+                    "confirmation_strategy": str(CONFIRMATION),
+                },
+            )
+
+        if DRY_RUN:
+            # state does not change in a dry run, so one snapshot serves every step
+            snapshot = get_snapshot()
+            simulate_bundler_requests(snapshot)
+            simulate_sequential_requests(snapshot)
+        else:
+            process_bundler_requests()
+            process_sequential_requests()
+
+        if not writer.is_done("bundler_vs_sequential"):
+            collect_totals(run_path)
+
+    return load_report(run_path)
 
+
+def collect_totals(run_path):
     # PROCESS RESULTS OF SEQUENTIAL EXPERIMENT
-    results = output_data["sequential_requests"]
+    # only the fields needed for the totals are kept, the rest stays on disk
+    results = []
+    portfolio_afterwards = None
+    for _, item in iter_records(run_path, "sequential_requests"):
+        results.append(
+            {
+                key: item[key]
+                for key in ("function", "estimated_gas", "used_gas", "tx_receipt_status")
+            }
+        )
+        portfolio_afterwards = item["portfolio"]
     all_success = all(item["tx_receipt_status"] == 1 for item in results)
 
-    total_est_gas = sum(item["estimated_gas"] for item in results)
-    total_used_gas = sum(item["used_gas"] for item in results)
+    total_est_gas = sum(item["estimated_gas"] or 0 for item in results)
+    total_used_gas = sum(item["used_gas"] or 0 for item in results)
 
     gas_totals = {
         "total_estimated_gas": total_est_gas,
         "total_used_gas": total_used_gas,
     }
     print(f"did all transactions succeed: {all_success}")
-    portfolio_afterwards = results[-1]["portfolio"]
     print(f"portfolio afterwards: {portfolio_afterwards}")
     print(gas_totals)
 
-    collect("sequential_gas_totals", gas_totals)
+    if not writer.is_done("sequential_gas_totals"):
+        collect("sequential_gas_totals", gas_totals)
 
     # PROCESS RESULTS OF BUNDLER EXPERIMENT
 
-    bundler_results = output_data["bundler_requests"]
+    [(_, bundler_result)] = iter_records(run_path, "bundler_requests")
 
     bundler_gas_totals = {
-        "total_estimated_gas": bundler_results[0]["estimated_gas"],
-        "total_used_gas": bundler_results[0]["used_gas"],
+        "total_estimated_gas": bundler_result["estimated_gas"],
+        "total_used_gas": bundler_result["used_gas"],
     }
-    collect("bundler_gas_totals", bundler_gas_totals)
+    if not writer.is_done("bundler_gas_totals"):
+        collect("bundler_gas_totals", bundler_gas_totals)
+
+    attribution = bundler_result["gas_attribution"]
+    collect(
+        "bundler_vs_sequential",
+        compare_with_sequential(results, attribution)
+        if attribution is not None
+        else {"error": "the bundle could not be traced"},
+    )
+
+
+if __name__ == "__main__":
+    devtools.debug(get_aave_metrics())
+    devtools.debug(get_portfolio())
+    devtools.debug(get_allowances())
+
+    # run experiment
+    report = run_experiment()
+
+    devtools.debug(get_aave_metrics())
+    devtools.debug(get_portfolio())
+    devtools.debug(get_allowances())
 
     # output report
     with open(OUTPUT_PATH, "w") as f:
-        json.dump(output_data, f, indent=2)
+        json.dump(report, f, indent=2)
+
+    if REPORT_EXPORT == "csv":
+        export_csv([RUN_PATH], RUN_PATH.removesuffix(".ndjson") + ".csv")
+    elif REPORT_EXPORT == "parquet":
+        export_parquet([RUN_PATH], RUN_PATH.removesuffix(".ndjson") + ".parquet")
+
+    snapshots.close()
+    allowance_reader.close()
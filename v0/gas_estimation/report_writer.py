@@ -0,0 +1,193 @@
+"""Append-only NDJSON storage for gas report records.
+
+Every ``collect()`` record is written as one ``{"section": ..., "record": ...}``
+line and flushed to disk straight away, so a crash at step 9 keeps steps 1-8
+and a rerun against the same file resumes after the last written record.
+Nothing is kept in memory; readers stream the file back line by line.
+
+The NDJSON file can be turned back into the classic report JSON
+(``load_report``) or flattened into one row per record for CSV or Parquet
+(``export_csv`` / ``export_parquet``), which is much cheaper to store and
+aggregate across many runs.
+"""
+
+import csv
+import json
+import os
+from collections import defaultdict
+
+SECTIONS = (
+    "meta",
+    "sequential_requests",
+    "sequential_gas_totals",
+    "bundler_requests",
+    "bundler_gas_totals",
+    "bundler_vs_sequential",
+)
+
+
+class ReportWriter:
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.completed = completed_steps(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _drop_partial_line(path)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def is_done(self, section, step=None):
+        """Whether ``section`` (or a given ``step`` of it) is already on disk."""
+        steps = self.completed.get(section, set())
+        return bool(steps) if step is None else step in steps
+
+    def append(self, section, record):
+        self.file.write(json.dumps({"section": section, "record": record}, default=str))
+        self.file.write("\n")
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.completed.setdefault(section, set()).add(record.get("step"))
+
+
+def _drop_partial_line(path, chunk=65536):
+    # a record cut off by a crash would otherwise be glued to the next append
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(position - chunk, 0)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+
+def iter_records(path, section=None):
+    """Stream ``(section, record)`` pairs, optionally for one section only.
+
+    A truncated last line (the process died mid-write) is skipped.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if section is None or entry["section"] == section:
+                yield entry["section"], entry["record"]
+
+
+def completed_steps(path):
+    completed = defaultdict(set)
+    for section, record in iter_records(path):
+        completed[section].add(record.get("step"))
+    return dict(completed)
+
+
+def load_report(path):
+    """Rebuild the classic ``{section: [records]}`` report from an NDJSON file."""
+    report = {section: [] for section in SECTIONS}
+    for section, record in iter_records(path):
+        report.setdefault(section, []).append(record)
+    return report
+
+
+def flatten(record, prefix=""):
+    """Flatten nested dicts into dotted columns; lists are kept as JSON text."""
+    row = {}
+    for key, value in record.items():
+        column = f"{prefix}{key}"
+        if isinstance(value, dict):
+            row.update(flatten(value, f"{column}."))
+        elif isinstance(value, list):
+            row[column] = json.dumps(value, default=str)
+        else:
+            row[column] = value
+    return row
+
+
+def _rows(paths):
+    for path in paths:
+        run = os.path.basename(path)
+        for section, record in iter_records(path):
+            yield {"run": run, "section": section, **flatten(record)}
+
+
+def _columns(paths):
+    # first pass: the union of columns, so rows can be written one at a time
+    columns = {}
+    for row in _rows(paths):
+        for column, value in row.items():
+            kinds = columns.setdefault(column, set())
+            if value is not None:
+                kinds.add(type(value))
+    return columns
+
+
+def export_csv(paths, csv_path):
+    """Write the records of one or more NDJSON runs to a single CSV file."""
+    columns = _columns(paths)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(columns))
+        writer.writeheader()
+        for row in _rows(paths):
+            writer.writerow(row)
+
+
+def export_parquet(paths, parquet_path, batch_size=10_000):
+    """Write the records of one or more NDJSON runs to a Parquet file.
+
+    Requires ``pyarrow``. Rows are written in batches of ``batch_size``.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+
+    fields = []
+    for column, kinds in _columns(paths).items():
+        if kinds == {int}:
+            fields.append(pa.field(column, pa.int64()))
+        elif kinds and kinds <= {int, float}:
+            fields.append(pa.field(column, pa.float64()))
+        elif kinds == {bool}:
+            fields.append(pa.field(column, pa.bool_()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    schema = pa.schema(fields)
+    strings = {field.name for field in fields if field.type == pa.string()}
+
+    def convert(row):
+        return {
+            column: str(value) if column in strings and value is not None else value
+            for column, value in row.items()
+        }
+
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        batch = []
+        for row in _rows(paths):
+            batch.append(convert(row))
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
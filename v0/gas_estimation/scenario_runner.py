@@ -0,0 +1,153 @@
+"""Run many bundler-vs-sequential scenarios in parallel and merge the reports.
+
+Scenarios are read from a JSON file (see ``scenarios.example.json``): each has
+a ``name`` and a list of ``actions`` understood by
+``gas_usage_report_base.build_request_lists``.
+
+Every wallet gets its own worker process, so scenarios on different wallets
+run in parallel while scenarios sharing a wallet run one after another (they
+would otherwise race on the nonce). Wallets come from comma-separated
+``SCENARIO_PRIVATE_KEYS``; ``SCENARIO_RPC_URLS`` holds either one RPC URL per
+key (e.g. one anvil fork each) or a single URL shared by all of them. Both
+default to ``PRIVATE_KEY`` / ``BASE_MAINNET_RPC_URL``.
+
+Each scenario streams its records to ``<run dir>/<name>.ndjson``. Set
+``SCENARIO_RUN_DIR`` to the directory of an interrupted run to resume it.
+
+    python scenario_runner.py scenarios.example.json
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+from eth_account import Account
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_wallets():
+    private_keys = os.getenv("SCENARIO_PRIVATE_KEYS") or os.getenv("PRIVATE_KEY")
+    rpc_urls = os.getenv("SCENARIO_RPC_URLS") or os.getenv("BASE_MAINNET_RPC_URL")
+    private_keys = [key.strip() for key in private_keys.split(",") if key.strip()]
+    rpc_urls = [url.strip() for url in rpc_urls.split(",") if url.strip()]
+    if len(rpc_urls) == 1:
+        rpc_urls = rpc_urls * len(private_keys)
+    if len(rpc_urls) != len(private_keys):
+        raise ValueError("SCENARIO_RPC_URLS needs one URL per key or a single URL")
+    return [
+        {"private_key": key, "rpc_url": url} for key, url in zip(private_keys, rpc_urls)
+    ]
+
+
+def run_wallet_scenarios(wallet, scenarios, run_dir):
+    """Worker entry point: run ``scenarios`` one after another on ``wallet``."""
+    # gas_usage_report_base reads its configuration at import time, so point
+    # the environment at this worker's wallet before importing it
+    os.environ["PRIVATE_KEY"] = wallet["private_key"]
+    os.environ["WALLET"] = Account.from_key(wallet["private_key"]).address
+    os.environ["BASE_MAINNET_RPC_URL"] = wallet["rpc_url"]
+    import gas_usage_report_base as report
+
+    results = {}
+    try:
+        for scenario in scenarios:
+            start = time.perf_counter()
+            (
+                report.non_multicall_request_list,
+                report.request_list_bundler,
+            ) = report.build_request_lists(scenario["actions"])
+            try:
+                run_path = os.path.join(run_dir, f"{scenario['name']}.ndjson")
+                output = report.run_experiment(run_path)
+                error = None
+            except Exception as e:
+                output, error = {}, repr(e)
+            results[scenario["name"]] = {
+                "wallet": report.WALLET,
+                "rpc_url": wallet["rpc_url"],
+                "actions": scenario["actions"],
+                "duration_seconds": round(time.perf_counter() - start, 2),
+                "error": error,
+                **output,
+            }
+    finally:
+        report.snapshots.close()
+        report.allowance_reader.close()
+    return results
+
+
+def summarize(results):
+    summary = []
+    for name, result in results.items():
+        if result["error"]:
+            summary.append({"scenario": name, "error": result["error"]})
+            continue
+        sequential = result["sequential_gas_totals"][0]["total_used_gas"]
+        bundler = result["bundler_gas_totals"][0]["total_used_gas"]
+        summary.append(
+            {
+                "scenario": name,
+                "actions": len(result["actions"]),
+                "sequential_used_gas": sequential,
+                "bundler_used_gas": bundler,
+                # no sequential gas (e.g. every step was skipped): no saving
+                "saving_percent": (
+                    round(100 * (1 - bundler / sequential), 2) if sequential else None
+                ),
+            }
+        )
+    return summary
+
+
+def run_scenarios(scenarios, wallets, run_dir):
+    groups = [[] for _ in wallets]
+    for idx, scenario in enumerate(scenarios):
+        groups[idx % len(wallets)].append(scenario)
+
+    results = {}
+    # one fresh process per wallet: the report module keeps per-wallet globals
+    with ProcessPoolExecutor(
+        max_workers=len(wallets),
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as executor:
+        futures = [
+            executor.submit(run_wallet_scenarios, wallet, group, run_dir)
+            for wallet, group in zip(wallets, groups)
+            if group
+        ]
+        for future in futures:
+            results.update(future.result())
+
+    # keep the input order regardless of which worker finished first
+    results = {scenario["name"]: results[scenario["name"]] for scenario in scenarios}
+    return {"summary": summarize(results), "scenarios": results}
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    with open(sys.argv[1]) as f:
+        scenarios = json.load(f)["scenarios"]
+    names = [scenario["name"] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("scenario names must be unique")
+
+    timestamp = datetime.now().isoformat(timespec="seconds").replace(":", "-")
+    run_dir = os.getenv("SCENARIO_RUN_DIR") or os.path.join(
+        SCRIPT_DIR, f"scenario_runs__{timestamp}"
+    )
+
+    start = time.perf_counter()
+    report = run_scenarios(scenarios, load_wallets(), run_dir)
+    print(f"ran {len(scenarios)} scenarios in {time.perf_counter() - start:.1f}s")
+    for row in report["summary"]:
+        print(row)
+
+    with open(os.path.join(SCRIPT_DIR, f"scenario_report__{timestamp}.json"), "w") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,183 @@
+"""Dry-run gas estimation with JSON-RPC batches and state overrides.
+
+Nothing is signed or broadcast: every unsigned transaction built by the
+Compass API is turned into a call, and one batch containing an
+``eth_estimateGas`` and a ``debug_traceCall`` (callTracer) per call is sent to
+the node. A state override funds the sender with ETH, and for bundler
+transactions installs the EIP-7702 delegation designator on the sender's
+account instead of relying on a signed authorization being mined first.
+The calls carry no authorization list, so the intrinsic gas the signed
+authorizations add to the real transaction is added to the results.
+
+Transactions that depend on each other (an approval, then the supply that
+spends it) go through ``simulate_sequence`` instead, which carries the state
+changes of every call into the overrides of the next one.
+"""
+
+from web3 import Web3
+
+# plenty of ETH for any call, so dry runs never need a funded wallet
+DEFAULT_BALANCE = 10**24
+DELEGATION_PREFIX = "0xef0100"
+ZERO_SLOT = "0x" + "00" * 32
+
+CALL_FIELDS = ("from", "to", "data", "value")
+# EIP-7702 intrinsic gas per authorization (PER_EMPTY_ACCOUNT_COST), before the
+# refund an authority account that already exists gets back
+PER_AUTHORIZATION_GAS = 25000
+
+
+def to_call(tx):
+    """Reduce an unsigned transaction dict to JSON-RPC call arguments.
+
+    Nonce, gas limit and fee fields are dropped so the node estimates from
+    scratch and the override balance covers execution.
+    """
+    call = {}
+    for field in CALL_FIELDS:
+        value = tx.get(field)
+        if field == "data" and value is None:
+            value = tx.get("input")
+        if value is None:
+            continue
+        if isinstance(value, int):
+            value = hex(value)
+        elif isinstance(value, bytes):
+            value = Web3.to_hex(value)
+        call[field] = value
+    return call
+
+
+def authorization_gas(tx):
+    """Intrinsic gas of the authorization list of ``tx``, which calls omit."""
+    return PER_AUTHORIZATION_GAS * len(tx.get("authorizationList") or [])
+
+
+def state_overrides(sender, delegate=None, balance=DEFAULT_BALANCE):
+    override = {"balance": hex(balance)}
+    if delegate is not None:
+        override["code"] = DELEGATION_PREFIX + delegate.lower().removeprefix("0x")
+    return {Web3.to_checksum_address(sender): override}
+
+
+def _result(estimate, trace, extra_gas=0):
+    """One simulation result from an estimateGas and a traceCall response.
+
+    ``extra_gas`` is added to both gas figures, for the costs the call does
+    not pay (see ``authorization_gas``).
+    """
+    error = estimate.get("error") or trace.get("error")
+    trace_result = trace.get("result") or {}
+    error = error or trace_result.get("error")
+    return {
+        "estimated_gas": int(estimate["result"], 16) + extra_gas
+        if "result" in estimate
+        else None,
+        "used_gas": int(trace_result["gasUsed"], 16) + extra_gas
+        if "gasUsed" in trace_result
+        else None,
+        "error": error if error is None else str(error),
+        "trace": trace_result,
+    }
+
+
+def _batch(w3, requests):
+    responses = w3.provider.make_batch_request(requests)
+    if not isinstance(responses, list):
+        raise RuntimeError(f"batch request failed: {responses.get('error')}")
+    return responses
+
+
+def simulate_batch(w3, txs, block="pending", delegate=None, tracer="callTracer"):
+    """Estimate and trace ``txs`` in a single JSON-RPC batch.
+
+    Returns one dict per transaction with ``estimated_gas``, ``used_gas``
+    (from the trace), ``error`` (``None`` on success) and the raw ``trace``.
+    Calls are independent: each one runs on top of ``block``, not on top of
+    the previous call in the batch (see ``simulate_sequence``). Both gas
+    figures include the intrinsic gas of the transaction's authorization list.
+    """
+    requests = []
+    for tx in txs:
+        call = to_call(tx)
+        overrides = state_overrides(call["from"], delegate)
+        requests.append(("eth_estimateGas", [call, block, overrides]))
+        requests.append(
+            (
+                "debug_traceCall",
+                [call, block, {"tracer": tracer, "stateOverrides": overrides}],
+            )
+        )
+
+    responses = _batch(w3, requests)
+    return [
+        _result(estimate, trace, authorization_gas(tx))
+        for tx, estimate, trace in zip(txs, responses[::2], responses[1::2])
+    ]
+
+
+def apply_state_diff(overrides, diff):
+    """Fold a ``prestateTracer`` diff (``diffMode``) into state ``overrides``.
+
+    ``post`` only holds what a call changed; a storage slot that is in ``pre``
+    but not in ``post`` was cleared, so it is overridden with zero.
+    """
+    pre, post = diff.get("pre", {}), diff.get("post", {})
+    for address in set(pre) | set(post):
+        before, after = pre.get(address, {}), post.get(address, {})
+        override = overrides.setdefault(Web3.to_checksum_address(address), {})
+        for field in ("balance", "code"):
+            if field in after:
+                override[field] = after[field]
+        if "nonce" in after:
+            override["nonce"] = hex(after["nonce"])
+        storage = dict.fromkeys(before.get("storage", {}), ZERO_SLOT)
+        storage.update(after.get("storage", {}))
+        if storage:
+            override.setdefault("stateDiff", {}).update(storage)
+    return overrides
+
+
+def simulate_sequence(w3, txs, block="pending", delegate=None, tracer="callTracer"):
+    """Estimate and trace ``txs`` as if they were mined one after the other.
+
+    Same results as ``simulate_batch``, but every call sees the state the
+    calls before it left: each one is estimated and traced together with a
+    ``prestateTracer`` diff, and that diff is folded into the state overrides
+    of the next call. This takes one JSON-RPC batch per transaction. A call
+    that fails leaves the state as it was.
+    """
+    overrides = {}
+    results = []
+    for tx in txs:
+        call = to_call(tx)
+        for address, override in state_overrides(call["from"], delegate).items():
+            # what earlier calls did to the sender wins over the defaults
+            overrides[address] = {**override, **overrides.get(address, {})}
+        estimate, trace, diff = _batch(
+            w3,
+            [
+                ("eth_estimateGas", [call, block, overrides]),
+                (
+                    "debug_traceCall",
+                    [call, block, {"tracer": tracer, "stateOverrides": overrides}],
+                ),
+                (
+                    "debug_traceCall",
+                    [
+                        call,
+                        block,
+                        {
+                            "tracer": "prestateTracer",
+                            "tracerConfig": {"diffMode": True},
+                            "stateOverrides": overrides,
+                        },
+                    ],
+                ),
+            ],
+        )
+        result = _result(estimate, trace, authorization_gas(tx))
+        results.append(result)
+        if result["error"] is None and "result" in diff:
+            apply_state_diff(overrides, diff["result"])
+    return results
@@ -0,0 +1,129 @@
+"""Concurrent account snapshots for the gas usage report.
+
+A step snapshot is made of ~9 independent Compass API reads (token balances,
+Aave position and allowances). They are all submitted to one long-lived
+thread pool, so a snapshot costs about as long as the slowest single read
+instead of the sum of all of them. The allowances stay API reads, like the
+other sections, so the snapshot keeps the amounts the API reports.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from compass_api_sdk import models
+
+
+def _timed(fn, **kwargs):
+    start = time.perf_counter()
+    result = fn(**kwargs)
+    return result, time.perf_counter() - start
+
+
+class SnapshotEngine:
+    SECTIONS = ("portfolio", "aave_metrics", "allowances")
+
+    def __init__(
+        self,
+        compass,
+        chain,
+        wallet,
+        tokens,
+        server_url=None,
+        max_workers=None,
+    ):
+        self.compass = compass
+        self.chain = chain
+        self.wallet = wallet
+        self.tokens = list(tokens)
+        self.server_url = server_url
+        # one worker per read keeps a full snapshot to a single round trip
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or 2 * len(self.tokens) + 3,
+            thread_name_prefix="snapshot",
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _calls(self, section):
+        common = {"chain": self.chain, "server_url": self.server_url}
+        if section == "portfolio":
+            return {
+                token: (
+                    self.compass.token.balance,
+                    {**common, "user": self.wallet, "token": token},
+                )
+                for token in self.tokens + ["ETH"]
+            }
+        if section == "aave_metrics":
+            return {
+                "position": (
+                    self.compass.aave_v3.user_position_per_token,
+                    {
+                        **common,
+                        "user": self.wallet,
+                        "token": models.AaveUserPositionPerTokenToken.USDC,
+                    },
+                ),
+                "summary": (
+                    self.compass.aave_v3.user_position_summary,
+                    {**common, "user": self.wallet},
+                ),
+            }
+        if section == "allowances":
+            pool = models.GenericAllowanceContractEnum.AAVE_V3_POOL
+            return {
+                token: (
+                    self.compass.universal.allowance,
+                    {**common, "user": self.wallet, "token": token, "contract": pool},
+                )
+                for token in self.tokens
+            }
+        raise ValueError(f"unknown snapshot section: {section}")
+
+    @staticmethod
+    def _assemble(section, results):
+        if section == "aave_metrics":
+            pos, summary = results["position"], results["summary"]
+            return {
+                "Collateral": summary.total_collateral,
+                "Debt": summary.total_debt,
+                "ATokenBalance": pos.token_balance,
+                "HealthFactor": summary.health_factor,
+                "LiquidationThreshold": summary.liquidation_threshold,
+            }
+        return {key: response.amount for key, response in results.items()}
+
+    def collect(self, *sections):
+        """Fetch the given sections (all by default) concurrently.
+
+        Returns ``(snapshot, timings)`` where ``snapshot`` has the same shape as
+        the old ``get_portfolio()`` / ``get_aave_metrics()`` / ``get_allowances()``
+        results and ``timings`` holds the wall time in seconds of every read.
+        """
+        sections = sections or self.SECTIONS
+        start = time.perf_counter()
+        futures = {
+            (section, key): self.executor.submit(_timed, fn, **kwargs)
+            for section in sections
+            for key, (fn, kwargs) in self._calls(section).items()
+        }
+
+        results = {section: {} for section in sections}
+        timings = {}
+        for (section, key), future in futures.items():
+            response, elapsed = future.result()
+            results[section][key] = response
+            timings[f"{section}.{key}"] = round(elapsed, 4)
+        timings["total"] = round(time.perf_counter() - start, 4)
+
+        snapshot = {
+            section: self._assemble(section, results[section]) for section in sections
+        }
+        return snapshot, timings
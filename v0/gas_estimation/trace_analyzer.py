@@ -0,0 +1,201 @@
+"""Split traced gas across the actions of a bundle.
+
+``attribute_actions`` walks a ``callTracer`` result and charges every
+sub-call whose 4-byte selector is a known action entry point (ERC-20
+``approve``, Aave ``supply``/``borrow``/``repay``/``withdraw``, Uniswap V3
+swaps) with its inclusive ``gasUsed``. Whatever is left of the top-level gas
+is bundler overhead: intrinsic gas, calldata and the multicall dispatch.
+``compare_with_sequential`` lines that up against the per-step receipts of the
+sequential run.
+
+``opcode_gas`` aggregates a ``structLog`` trace per opcode. Those traces can be
+hundreds of MB, so it consumes them as a stream (see ``stream_struct_logs``)
+and never holds more than two steps in memory.
+"""
+
+import json
+from collections import Counter, defaultdict
+
+import ijson
+import requests
+
+ACTION_SELECTORS = {
+    "0x095ea7b3": "allowance",  # approve(address,uint256)
+    "0x617ba037": "supply",  # supply(address,uint256,address,uint16)
+    "0xe8eda9df": "supply",  # deposit(address,uint256,address,uint16)
+    "0xa415bcad": "borrow",  # borrow(address,uint256,uint256,uint16,address)
+    "0x573ade81": "repay",  # repay(address,uint256,uint256,address)
+    "0x69328dec": "withdraw",  # withdraw(address,uint256,address)
+    "0x414bf389": "swap",  # SwapRouter exactInputSingle
+    "0x04e45aaf": "swap",  # SwapRouter02 exactInputSingle
+    "0xdb3e2198": "swap",  # SwapRouter exactOutputSingle
+    "0x5023b4df": "swap",  # SwapRouter02 exactOutputSingle
+    "0xc04b8d59": "swap",  # SwapRouter exactInput
+    "0xb858183f": "swap",  # SwapRouter02 exactInput
+    "0xf28c0498": "swap",  # SwapRouter exactOutput
+    "0x09b81346": "swap",  # SwapRouter02 exactOutput
+}
+
+# sequential report `function` names -> action labels
+SEQUENTIAL_FUNCTIONS = {
+    "allowance_set": "allowance",
+    "supply": "supply",
+    "borrow": "borrow",
+    "repay": "repay",
+    "withdraw": "withdraw",
+    "swap_sell_exactly": "swap",
+    "swap_buy_exactly": "swap",
+}
+
+CALL_OPS = {"CALL", "CALLCODE", "DELEGATECALL", "STATICCALL", "CREATE", "CREATE2"}
+
+
+def _gas(value):
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def attribute_actions(call_trace, extra_gas=0):
+    """Attribute a callTracer result to bundle actions.
+
+    Only the outermost frame matching an action selector is counted, so the
+    token transfers made inside e.g. an Aave supply stay part of the supply.
+    ``extra_gas`` is gas the traced call did not pay (the intrinsic gas of an
+    authorization list); it counts towards the total and the overhead.
+    """
+    actions = []
+    stack = [call_trace]
+    while stack:
+        frame = stack.pop()
+        label = ACTION_SELECTORS.get((frame.get("input") or "")[:10].lower())
+        if label is not None:
+            actions.append(
+                {
+                    "action": label,
+                    "to": frame.get("to"),
+                    "gas_used": _gas(frame.get("gasUsed", 0)),
+                    "error": frame.get("error"),
+                }
+            )
+            continue
+        # reversed so that actions come out in execution order
+        stack.extend(reversed(frame.get("calls") or []))
+
+    total = _gas(call_trace.get("gasUsed", 0)) + extra_gas
+    by_action = defaultdict(int)
+    for action in actions:
+        by_action[action["action"]] += action["gas_used"]
+    return {
+        "total_gas": total,
+        "actions": actions,
+        "by_action": dict(by_action),
+        "overhead_gas": total - sum(by_action.values()),
+    }
+
+
+def compare_with_sequential(sequential_records, attribution):
+    """Per-action gas of the sequential run vs. the same actions in the bundle.
+
+    A positive ``saving`` means the bundle spends less gas on that action; the
+    bundle's own ``overhead_gas`` is reported separately.
+    """
+    sequential = defaultdict(int)
+    transactions = Counter()
+    for record in sequential_records:
+        label = SEQUENTIAL_FUNCTIONS.get(record["function"], record["function"])
+        sequential[label] += record["used_gas"] or 0
+        transactions[label] += 1
+
+    rows = []
+    for label in dict.fromkeys([*sequential, *attribution["by_action"]]):
+        seq_gas = sequential.get(label, 0)
+        bundled_gas = attribution["by_action"].get(label, 0)
+        rows.append(
+            {
+                "action": label,
+                "sequential_transactions": transactions.get(label, 0),
+                "sequential_gas": seq_gas,
+                "bundled_gas": bundled_gas,
+                "saving": seq_gas - bundled_gas,
+            }
+        )
+    sequential_total = sum(sequential.values())
+    return {
+        "actions": rows,
+        "bundle_overhead_gas": attribution["overhead_gas"],
+        "sequential_total_gas": sequential_total,
+        "bundle_total_gas": attribution["total_gas"],
+        "total_saving": sequential_total - attribution["total_gas"],
+    }
+
+
+def stream_struct_logs(rpc_url, call, block="latest", state_overrides=None, timeout=300):
+    """Yield the structLog steps of ``debug_traceCall`` without buffering them.
+
+    Raises ``RuntimeError`` once the stream is consumed if the node answered
+    with a JSON-RPC error instead of a trace.
+    """
+    config = {"enableMemory": False, "enableReturnData": False, "disableStorage": True}
+    if state_overrides:
+        config["stateOverrides"] = state_overrides
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "debug_traceCall",
+        "params": [call, block, config],
+    }
+    with requests.post(
+        rpc_url,
+        data=json.dumps(payload),
+        headers={"Content-Type": "application/json"},
+        stream=True,
+        timeout=timeout,
+    ) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        error = {}
+        events = _recording_error(ijson.parse(response.raw), error)
+        yield from ijson.items(events, "result.structLogs.item")
+    if error:
+        raise RuntimeError(f"debug_traceCall failed: {error}")
+
+
+def _recording_error(events, error):
+    """Pass parser events through, copying the top-level ``error`` into ``error``."""
+    for prefix, event, value in events:
+        if prefix == "error" and event not in ("start_map", "map_key", "end_map"):
+            error["message"] = value
+        elif prefix.startswith("error."):
+            error[prefix.removeprefix("error.")] = value
+        yield prefix, event, value
+
+
+def opcode_gas(struct_logs):
+    """Aggregate an iterable of structLog steps into per-opcode count and gas.
+
+    For call-type opcodes the gas forwarded to the callee is not the opcode's
+    own cost; it is taken out using the callee's starting gas (or the gas left
+    once execution is back at the same depth), so that each unit of gas is
+    charged to the opcode that actually consumed it.
+    """
+    count = Counter()
+    gas = Counter()
+    previous = None
+    for step in struct_logs:
+        if previous is not None:
+            _charge(previous, step, count, gas)
+        previous = step
+    if previous is not None:
+        _charge(previous, None, count, gas)
+    return {op: {"count": count[op], "gas": gas[op]} for op, _ in gas.most_common()}
+
+
+def _charge(step, following, count, gas):
+    op = step["op"]
+    cost = int(step["gasCost"])
+    if following is not None and op in CALL_OPS:
+        if following["depth"] > step["depth"]:
+            cost -= int(following["gas"])
+        elif following["depth"] == step["depth"]:
+            cost = int(step["gas"]) - int(following["gas"])
+    count[op] += 1
+    gas[op] += max(cost, 0)
@@ -0,0 +1,86 @@
+"""asyncio version of main.py: the same Aave looping flow, for any number of
+wallets at once, driven by one event loop."""
+
+import asyncio
+import os
+
+import dotenv
+from compass_api_sdk import CompassAPI
+from compass_common import AsyncTxSubmitter
+from eth_account import Account
+from web3 import AsyncWeb3
+
+dotenv.load_dotenv()
+
+# comma-separated; one looping flow runs per key
+PRIVATE_KEYS = (os.getenv("PRIVATE_KEYS") or os.getenv("PRIVATE_KEY")).split(",")
+ETHEREUM_RPC_URL = os.getenv("ETHEREUM_RPC_URL")
+MAX_CONCURRENT_FLOWS = int(os.getenv("MAX_CONCURRENT_FLOWS", "100"))
+
+
+async def aave_looping_flow(compass_api_sdk, w3, private_key):
+    account = Account.from_key(private_key)
+    submitter = AsyncTxSubmitter(w3, private_key)
+
+    swap_tx = await compass_api_sdk.swap.swap_odos_async(
+        chain="ethereum",
+        sender=account.address,
+        token_in="ETH",
+        token_out="USDC",
+        amount=1,
+        max_slippage_percent=1,
+    )
+    # the swap has to be mined before the authorization is requested: the
+    # authorization nonce is derived from the wallet's current nonce
+    await submitter.send(swap_tx)
+
+    # GET AND SIGN AUTHORIZATION
+    auth = await compass_api_sdk.transaction_bundler.transaction_bundler_authorization_async(
+        chain="ethereum", sender=account.address
+    )
+    signed_auth = Account.sign_authorization(auth.model_dump(by_alias=True), private_key)
+
+    # CONFIGURE LEVERAGE PARAMETERS
+    looping_tx = await compass_api_sdk.transaction_bundler.transaction_bundler_aave_loop_async(
+        chain="ethereum",
+        sender=account.address,
+        signed_authorization=signed_auth.model_dump(),
+        collateral_token="USDC",
+        borrow_token="WETH",
+        initial_collateral_amount=100,
+        multiplier=1.5,
+        max_slippage_percent=2.5,
+        loan_to_value=70,
+    )
+
+    # SIGN AND BROADCAST TRANSACTION
+    receipt = await submitter.send(looping_tx)
+    return account.address, AsyncWeb3.to_hex(receipt["transactionHash"])
+
+
+async def main():
+    w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(ETHEREUM_RPC_URL))
+    limit = asyncio.Semaphore(MAX_CONCURRENT_FLOWS)
+
+    async with CompassAPI(
+        api_key_auth=os.getenv("COMPASS_API_KEY"),
+        server_url=os.getenv("SERVER_URL")
+        or None,  # For internal testing purposes. You do not need to set this.
+    ) as compass_api_sdk:
+
+        async def run(private_key):
+            async with limit:
+                return await aave_looping_flow(compass_api_sdk, w3, private_key)
+
+        results = await asyncio.gather(
+            *(run(key.strip()) for key in PRIVATE_KEYS), return_exceptions=True
+        )
+
+    for key, result in zip(PRIVATE_KEYS, results):
+        print(Account.from_key(key.strip()).address, result)
+    if any(isinstance(result, Exception) for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
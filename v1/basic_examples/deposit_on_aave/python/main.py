@@ -50,6 +50,13 @@ def send_tx(response):
 
 # SNIPPET END 2
 
+# Shared helpers of the examples in this repo, outside of the documented snippets
+from compass_common import AllowancePlanner, AllowanceReader, TxSubmitter
+
+# Keeps track of the wallet's nonce locally, so independent transactions can be
+# sent back to back.
+submitter = TxSubmitter(w3, PRIVATE_KEY)
+
 
 # assuming your wallet has ETH but not USDC. We sell 0.03 USD of ETH for USDC.
 
@@ -65,19 +72,25 @@ swap_tx = compass.swap.swap_odos(
     max_slippage_percent=1,
 )
 
-devtools.debug(send_tx(swap_tx))
-
-time.sleep(1)
-
-allowance_tx = compass.universal.generic_allowance_set(
-    chain=CHAIN,
-    sender=WALLET_ADDRESS,
-    contract="AaveV3Pool",
-    amount=0.01,
-    token=USDC,
-)
-
-devtools.debug(send_tx(allowance_tx))
+# only set the allowance if the current one is too low
+planner = AllowancePlanner(AllowanceReader(w3, compass, CHAIN), WALLET_ADDRESS)
+allowance_txs = [
+    compass.universal.generic_allowance_set(
+        chain=CHAIN,
+        sender=WALLET_ADDRESS,
+        contract=spender,
+        amount=amount,
+        token=token,
+    )
+    for token, spender, amount in planner.missing([(USDC, "AaveV3Pool", 0.01)])
+]
+
+# the swap and the allowance are independent: send both, then wait once
+tx_hashes = submitter.submit_many([swap_tx, *allowance_txs])
+start = time.time()
+submitter.confirm(tx_hashes)
+print(f"⏱️ Time waiting for receipts: {time.time() - start:.2f} seconds")
+devtools.debug(tx_hashes)
 
 devtools.debug(
     compass.universal.generic_allowance(
@@ -27,6 +27,9 @@ account = Account.from_key(PRIVATE_KEY)
 WALLET_ADDRESS = account.address
 # SNIPPET END 11
 
+# Shared helpers of the examples in this repo, outside of the documented snippets
+from compass_common import TxSubmitter
+
 # SNIPPET START 12
 # Initialize Compass SDK and Account
 w3 = Web3(Web3.HTTPProvider(BASE_RPC_URL))
@@ -37,6 +40,10 @@ compass = CompassAPI(
 )
 # SNIPPET END 12
 
+# Keeps track of the wallet's nonce locally, so the swap below needs no sleep
+# before the next transaction is requested.
+submitter = TxSubmitter(w3, PRIVATE_KEY)
+
 
 # assuming your wallet has ETH but not USDC. We sell 0.03 USD of ETH for USDC.
 
@@ -52,23 +59,7 @@ swap_tx = compass.swap.swap_odos(
     max_slippage_percent=1,
 )
 
-
-# Helper function to sign and broadcast unsigned transaction:
-def send_tx(response):
-    tx = response.model_dump(by_alias=True)
-    signed_tx = w3.eth.account.sign_transaction(tx["transaction"], PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction).hex()
-    start = time.time()
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    end = time.time()
-    print(f"⏱️ Time waiting for receipt: {end - start:.2f} seconds")
-    # convert receipt to a serializable dict
-    return tx_hash  # , dict(receipt) # <- uncomment if you need to see the tx receipt
-
-
-print(send_tx(swap_tx))
-
-time.sleep(1)
+print(Web3.to_hex(submitter.send(swap_tx)["transactionHash"]))
 
 # SNIPPET START 13
 # SET ALLOWANCE
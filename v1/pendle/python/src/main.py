@@ -12,6 +12,9 @@ ARBITRUM_RPC_URL = os.getenv("ARBITRUM_RPC_URL")
 WALLET_ADDRESS = Account.from_key(PRIVATE_KEY).address
 # SNIPPET END 21
 
+# Shared helpers of the examples in this repo, outside of the documented snippets
+from compass_common import TxSubmitter
+
 # SNIPPET START 20
 compass_api_sdk = CompassAPI(
     api_key_auth=os.getenv("COMPASS_API_KEY"),
@@ -22,6 +25,9 @@ compass_api_sdk = CompassAPI(
 w3 = Web3(Web3.HTTPProvider(ARBITRUM_RPC_URL))
 # SNIPPET END 20
 
+# Takes the wallet's nonces locally; used outside of the snippets.
+submitter = TxSubmitter(w3, PRIVATE_KEY)
+
 # SNIPPET START 1
 markets_response = compass_api_sdk.pendle.pendle_markets(
     chain="arbitrum",
@@ -47,11 +53,7 @@ swap_tx = compass_api_sdk.swap.swap_odos(
     amount=0.1,
     max_slippage_percent=2,
 )
-signed_tx = w3.eth.account.sign_transaction(
-    swap_tx.transaction.model_dump(by_alias=True), PRIVATE_KEY
-)
-tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-w3.eth.wait_for_transaction_receipt(tx_hash)
+submitter.send(swap_tx)
 
 # SNIPPET START 5
 usdc_allowance = compass_api_sdk.universal.generic_allowance(
@@ -0,0 +1,165 @@
+"""Cached catalogue of the Pendle markets of one chain.
+
+``pendle_markets`` is a full API round trip, and every entry's ``pt``, ``yt``,
+``sy`` and ``underlying_asset`` come as ``<chain id>-<address>`` strings that
+the flows parse again on every use. ``MarketCatalogue`` fetches the list once
+per ``ttl`` seconds, optionally keeps it in a JSON file so that other
+processes (and the next run) start warm, and stores every market as a plain
+dict with the addresses already parsed and lowercased:
+
+    {"name", "address", "expiry", "pt", "yt", "sy", "underlying_asset"}
+
+Lookups by market, PT, YT or underlying address and by expiry are dict and
+bisect lookups on indexes built once per refresh.
+
+    catalogue = MarketCatalogue(compass_api_sdk, "arbitrum", cache_path=".pendle_markets.json")
+    market = catalogue.by_pt(pt_address)
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def _address(value):
+    # "42161-0xabc..." -> "0xabc..."
+    return value.rsplit("-", 1)[-1].lower()
+
+
+def _iso_utc(value):
+    # expiries are compared as strings, so they must all be UTC
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def _parse(market):
+    return {
+        "name": market.name,
+        "address": market.address.lower(),
+        "expiry": _iso_utc(market.expiry),
+        "pt": _address(market.pt),
+        "yt": _address(market.yt),
+        "sy": _address(market.sy),
+        "underlying_asset": _address(market.underlying_asset),
+    }
+
+
+class MarketCatalogue:
+    def __init__(self, compass, chain, ttl=300, cache_path=None):
+        self.compass = compass
+        self.chain = chain
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._fetched_at = 0.0
+        self._markets = []
+        self._index = {}
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if cached.get("chain") != self.chain:
+            return False
+        if time.time() - cached["fetched_at"] >= self.ttl:
+            return False
+        self._build(cached["markets"], cached["fetched_at"])
+        return True
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "chain": self.chain,
+                    "fetched_at": self._fetched_at,
+                    "markets": self._markets,
+                },
+                f,
+            )
+        # readers never see a half written file
+        os.replace(tmp_path, self.cache_path)
+
+    def _build(self, markets, fetched_at):
+        index = {key: {} for key in ("address", "pt", "yt", "underlying_asset")}
+        for market in markets:
+            index["address"][market["address"]] = market
+            index["pt"][market["pt"]] = market
+            index["yt"][market["yt"]] = market
+            index["underlying_asset"].setdefault(market["underlying_asset"], []).append(
+                market
+            )
+        by_expiry = sorted(markets, key=lambda market: market["expiry"])
+        index["expiry"] = [market["expiry"] for market in by_expiry]
+        index["by_expiry"] = by_expiry
+        # swapped in together so concurrent readers see one consistent version
+        self._markets, self._index, self._fetched_at = markets, index, fetched_at
+
+    def refresh(self):
+        """Fetch the market list from the API now, regardless of the TTL."""
+        response = self.compass.pendle.pendle_markets(chain=self.chain)
+        with self._lock:
+            self._build([_parse(market) for market in response.markets], time.time())
+            self._save()
+
+    def _ensure_fresh(self):
+        if time.time() - self._fetched_at < self.ttl:
+            return
+        with self._lock:
+            if time.time() - self._fetched_at < self.ttl or self._load():
+                return
+        # outside the lock: a slow API call should not block readers of the
+        # (stale) catalogue; at worst two threads refresh at the same time
+        self.refresh()
+
+    def markets(self):
+        """All markets, in the order the API returned them."""
+        self._ensure_fresh()
+        return self._markets
+
+    def by_address(self, market_address):
+        self._ensure_fresh()
+        return self._index["address"].get(market_address.lower())
+
+    def by_pt(self, pt_address):
+        self._ensure_fresh()
+        return self._index["pt"].get(_address(pt_address))
+
+    def by_yt(self, yt_address):
+        self._ensure_fresh()
+        return self._index["yt"].get(_address(yt_address))
+
+    def by_underlying(self, underlying_address):
+        self._ensure_fresh()
+        return self._index["underlying_asset"].get(_address(underlying_address), [])
+
+    def expiring_between(self, start, end):
+        """Markets whose expiry is in ``[start, end)``, soonest first.
+
+        ``start`` and ``end`` are datetimes or ISO strings (naive means UTC).
+        """
+        self._ensure_fresh()
+        start, end = _iso_utc(start), _iso_utc(end)
+        expiries = self._index["expiry"]
+        lo = bisect.bisect_left(expiries, start)
+        hi = bisect.bisect_left(expiries, end)
+        return self._index["by_expiry"][lo:hi]
+
+    def active(self, now=None):
+        """Markets that have not expired yet, soonest expiry first."""
+        now = now or datetime.now(timezone.utc)
+        self._ensure_fresh()
+        expiries = self._index["expiry"]
+        return self._index["by_expiry"][bisect.bisect_right(expiries, _iso_utc(now)) :]
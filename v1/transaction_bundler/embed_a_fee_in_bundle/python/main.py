@@ -39,6 +39,12 @@ compass = CompassAPI(
 )
 # SNIPPET END 22
 
+# Shared helpers of the examples in this repo, outside of the documented snippets
+from compass_common import TxSubmitter
+
+# Keeps track of the wallet's nonce locally; used outside of the snippets.
+submitter = TxSubmitter(w3, PRIVATE_KEY)
+
 
 # setup assuming  your wallet has ETH but not USDC. We sell 0.03 USD of ETH for USDC.
 one_USD_in_ETH = 1 / float(compass.token.token_price(chain=CHAIN, token=ETH).price)
@@ -53,24 +59,9 @@ swap_tx = compass.swap.swap_odos(
     max_slippage_percent=1,
 )
 
-
-# Helper function to sign and broadcast unsigned transaction:
-# Can be re-used for any unsigned transaction our API returns.
-def send_tx(response):
-    tx = response.model_dump(by_alias=True)
-    signed_tx = w3.eth.account.sign_transaction(tx["transaction"], PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction).hex()
-    start = time.time()
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    end = time.time()
-    if receipt.status != 1:
-        raise Exception()
-    print(f"⏱️ Time waiting for receipt: {end - start:.2f} seconds")
-    # convert receipt to a serializable dict
-    return tx_hash  # , dict(receipt) # <- uncomment if you need to see the tx receipt
-
-
-print(send_tx(swap_tx))
+# The swap has to be mined before the authorization is requested: the
+# authorization nonce is derived from the wallet's current nonce.
+print(Web3.to_hex(submitter.send(swap_tx)["transactionHash"]))
 
 # SNIPPET START 23
 # Get and Sign Authorization
@@ -85,9 +76,6 @@ signed_authorization = signed_auth.model_dump(by_alias=True)
 # SNIPPET END 23
 
 
-time.sleep(1)
-
-
 # SNIPPET START 24
 
 DEPOSIT_AMOUNT = 0.01  # amount that your user will deposit in a morpho vault
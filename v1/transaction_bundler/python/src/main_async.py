@@ -0,0 +1,103 @@
+"""asyncio version of main.py: the same bundled WETH -> USDC swap, for any
+number of wallets at once, driven by one event loop."""
+
+import asyncio
+import os
+
+import dotenv
+from compass_api_sdk import CompassAPI, models
+from compass_common import AsyncTxSubmitter
+from eth_account import Account
+from web3 import AsyncWeb3
+
+dotenv.load_dotenv()
+
+# comma-separated; one bundler flow runs per key
+PRIVATE_KEYS = (os.getenv("PRIVATE_KEYS") or os.getenv("PRIVATE_KEY")).split(",")
+ETHEREUM_RPC_URL = os.getenv("ETHEREUM_RPC_URL")
+MAX_CONCURRENT_FLOWS = int(os.getenv("MAX_CONCURRENT_FLOWS", "100"))
+
+
+async def transaction_bundler_flow(compass_api_sdk, w3, private_key):
+    account = Account.from_key(private_key)
+    submitter = AsyncTxSubmitter(w3, private_key)
+
+    swap_tx = await compass_api_sdk.swap.swap_odos_async(
+        chain="ethereum",
+        sender=account.address,
+        token_in="ETH",
+        token_out="WETH",
+        amount=1,
+        max_slippage_percent=1,
+    )
+    # the swap has to be mined before the authorization is requested: the
+    # authorization nonce is derived from the wallet's current nonce
+    await submitter.send(swap_tx)
+
+    # GET AND SIGN AUTHORIZATION
+    auth = await compass_api_sdk.transaction_bundler.transaction_bundler_authorization_async(
+        chain="ethereum", sender=account.address
+    )
+    auth_dict = auth.model_dump(mode="json", by_alias=True)
+    signed_authorization = Account.sign_authorization(auth_dict, private_key).model_dump(
+        by_alias=True
+    )
+
+    # CREATE BUNDLED TRANSACTIONS
+    bundler_tx = await compass_api_sdk.transaction_bundler.transaction_bundler_execute_async(
+        chain="ethereum",
+        sender=account.address,
+        signed_authorization=signed_authorization,
+        actions=[
+            models.UserOperation(
+                body=models.SetAllowanceParams(
+                    ACTION_TYPE="SET_ALLOWANCE",
+                    token="WETH",
+                    contract=models.SetAllowanceParamsContractEnum.UNISWAP_V3_ROUTER,
+                    amount=1,
+                )
+            ),
+            models.UserOperation(
+                body=models.UniswapSellExactlyParams(
+                    ACTION_TYPE="UNISWAP_SELL_EXACTLY",
+                    token_in="WETH",
+                    token_out="USDC",
+                    fee="0.01",
+                    max_slippage_percent=0.5,
+                    amount_in=1,
+                )
+            ),
+        ],
+    )
+
+    # SIGN AND BROADCAST TRANSACTION
+    receipt = await submitter.send(bundler_tx)
+    return account.address, AsyncWeb3.to_hex(receipt["transactionHash"])
+
+
+async def main():
+    w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(ETHEREUM_RPC_URL))
+    limit = asyncio.Semaphore(MAX_CONCURRENT_FLOWS)
+
+    async with CompassAPI(
+        api_key_auth=os.getenv("COMPASS_API_KEY"),
+        server_url=os.getenv("SERVER_URL")
+        or None,  # For internal testing purposes. You do not need to set this.
+    ) as compass_api_sdk:
+
+        async def run(private_key):
+            async with limit:
+                return await transaction_bundler_flow(compass_api_sdk, w3, private_key)
+
+        results = await asyncio.gather(
+            *(run(key.strip()) for key in PRIVATE_KEYS), return_exceptions=True
+        )
+
+    for key, result in zip(PRIVATE_KEYS, results):
+        print(Account.from_key(key.strip()).address, result)
+    if any(isinstance(result, Exception) for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
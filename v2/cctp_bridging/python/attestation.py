@@ -0,0 +1,268 @@
+"""Wait for Circle attestations of CCTP bridges.
+
+``cctp_mint`` answers with one of three typed responses:
+
+- ``MintPreparePendingResponse``: no attestation yet (it carries Circle's
+  ``estimated_wait_seconds``),
+- ``MintPrepareReadyResponse``: attested, ``transaction`` mints the USDC,
+- ``MintPrepareCompletedResponse``: someone already minted.
+
+Instead of asking every 10 seconds, the waiters sleep according to a
+``BackoffPolicy``: after the first poll they wait for Circle's estimate, later
+polls back off exponentially up to ``maximum`` seconds. Every delay is cut by
+a random part of up to ``jitter``, so that bridges burnt together do not poll
+in lockstep. Errors of a poll (network, rate limit) are retried the same way
+until the policy's ``timeout``. An ``on_poll`` callback that raises is logged
+and does not stop the waiting.
+
+The pending response also names an ``sse_url`` and a ``status_url``. They are
+not used: the waiters only poll ``cctp_mint``, which is what the mint needs
+anyway, and pushing the polls out according to Circle's estimate already
+keeps them rare.
+
+``AttestationWaiter.wait`` blocks for one bridge. ``AttestationScheduler``
+tracks any number of bridges from one asyncio task: a heap ordered by due
+time decides which bridges are polled next, at most ``max_in_flight`` polls
+run at once, and each tracked bridge is just an awaitable.
+
+    scheduler = AttestationScheduler(compass_api)
+    attestation = await scheduler.track(bridge_id, burn_tx_hash, sender)
+    attestation.state    # READY or COMPLETED
+    attestation.timings  # seconds after tracking started each state was seen
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+
+from compass_api_sdk import models
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+READY = "ready"
+COMPLETED = "completed"
+
+STATES = {
+    models.MintPreparePendingResponse: PENDING,
+    models.MintPrepareReadyResponse: READY,
+    models.MintPrepareCompletedResponse: COMPLETED,
+}
+
+
+class AttestationTimeout(Exception):
+    def __init__(self, attestation, last_error=None):
+        self.attestation = attestation
+        self.last_error = last_error
+        super().__init__(
+            f"bridge {attestation.bridge_id} still {attestation.state} after "
+            f"{attestation.attempts} polls and {attestation.errors} failed ones"
+            + (f" (last error: {last_error!r})" if last_error else "")
+        )
+
+
+def _notify(on_poll, attestation):
+    """Call ``on_poll``; a failing callback must not lose the bridge."""
+    if on_poll is None:
+        return
+    try:
+        on_poll(attestation)
+    except Exception:
+        logger.exception("on_poll failed for bridge %s", attestation.bridge_id)
+
+
+def state_of(response):
+    for response_type, state in STATES.items():
+        if isinstance(response, response_type):
+            return state
+    raise TypeError(f"unexpected cctp_mint response: {type(response).__name__}")
+
+
+class BackoffPolicy:
+    def __init__(self, initial=5, factor=1.6, maximum=60, jitter=0.2, timeout=30 * 60):
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.jitter = jitter
+        self.timeout = timeout
+
+    def delay(self, attempt, estimated_wait=None):
+        """Seconds to wait before poll number ``attempt + 1``.
+
+        ``estimated_wait`` is Circle's estimate (from the pending response)
+        of how long the attestation still takes; before it has passed there is
+        no point in polling.
+        """
+        delay = min(self.initial * self.factor**attempt, self.maximum)
+        if attempt == 0 and estimated_wait:
+            delay = max(delay, estimated_wait)
+        return delay * (1 - random.uniform(0, self.jitter))
+
+
+class Attestation:
+    def __init__(self, bridge_id, burn_tx_hash, sender):
+        self.bridge_id = bridge_id
+        self.burn_tx_hash = burn_tx_hash
+        self.sender = sender
+        self.state = None
+        self.response = None
+        self.attempts = 0
+        self.errors = 0
+        self.started_at = time.monotonic()
+        # state -> seconds after started_at it was first seen
+        self.timings = {}
+
+    @property
+    def done(self):
+        return self.state in (READY, COMPLETED)
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def record(self, response):
+        self.attempts += 1
+        self.response = response
+        self.state = state_of(response)
+        self.timings.setdefault(self.state, round(self.elapsed(), 3))
+
+    def next_delay(self, policy):
+        estimated_wait = getattr(self.response, "estimated_wait_seconds", None)
+        return policy.delay(self.attempts + self.errors - 1, estimated_wait)
+
+    def __repr__(self):
+        return (
+            f"Attestation({self.bridge_id!r}, state={self.state!r}, "
+            f"attempts={self.attempts}, timings={self.timings})"
+        )
+
+
+class AttestationWaiter:
+    """Blocking waiter for one bridge at a time."""
+
+    def __init__(self, compass, policy=None, on_poll=None):
+        self.compass = compass
+        self.policy = policy or BackoffPolicy()
+        # called with the Attestation after every poll (e.g. for logging)
+        self.on_poll = on_poll
+
+    def wait(self, bridge_id, burn_tx_hash, sender):
+        attestation = Attestation(bridge_id, burn_tx_hash, sender)
+        last_error = None
+        while True:
+            try:
+                attestation.record(
+                    self.compass.bridge.cctp_mint(
+                        bridge_id=bridge_id, burn_tx_hash=burn_tx_hash, sender=sender
+                    )
+                )
+            except Exception as e:
+                attestation.errors += 1
+                last_error = e
+            _notify(self.on_poll, attestation)
+            if attestation.done:
+                return attestation
+            delay = attestation.next_delay(self.policy)
+            if attestation.elapsed() + delay > self.policy.timeout:
+                raise AttestationTimeout(attestation, last_error)
+            time.sleep(delay)
+
+
+class AttestationScheduler:
+    """Track many bridges from one asyncio task.
+
+    ``track`` returns once the bridge is attested (or already minted) and
+    raises ``AttestationTimeout`` when the policy's timeout passes first.
+    """
+
+    def __init__(self, compass, policy=None, max_in_flight=50, on_poll=None):
+        self.compass = compass
+        self.policy = policy or BackoffPolicy()
+        self.max_in_flight = max_in_flight
+        self.on_poll = on_poll
+        self._due = []  # heap of (due time, sequence number, bridge id)
+        self._sequence = itertools.count()
+        self._tracked = {}  # bridge id -> [Attestation, future, last error]
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._tracked)
+
+    async def track(self, bridge_id, burn_tx_hash, sender):
+        if bridge_id in self._tracked:
+            return await asyncio.shield(self._tracked[bridge_id][1])
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        attestation = Attestation(bridge_id, burn_tx_hash, sender)
+        self._tracked[bridge_id] = [attestation, future, None]
+        self._schedule(bridge_id, 0)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return await asyncio.shield(future)
+
+    def _schedule(self, bridge_id, delay):
+        heapq.heappush(
+            self._due, (time.monotonic() + delay, next(self._sequence), bridge_id)
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _poll(self, bridge_id):
+        entry = self._tracked[bridge_id]
+        attestation, future, _ = entry
+        try:
+            attestation.record(
+                await self.compass.bridge.cctp_mint_async(
+                    bridge_id=bridge_id,
+                    burn_tx_hash=attestation.burn_tx_hash,
+                    sender=attestation.sender,
+                )
+            )
+        except Exception as e:
+            attestation.errors += 1
+            entry[2] = e
+        _notify(self.on_poll, attestation)
+
+        if attestation.done:
+            del self._tracked[bridge_id]
+            if not future.done():
+                future.set_result(attestation)
+            return
+        delay = attestation.next_delay(self.policy)
+        if attestation.elapsed() + delay > self.policy.timeout:
+            del self._tracked[bridge_id]
+            if not future.done():
+                future.set_exception(AttestationTimeout(attestation, entry[2]))
+            return
+        self._schedule(bridge_id, delay)
+
+    async def _run(self):
+        slots = asyncio.Semaphore(self.max_in_flight)
+        polls = set()
+
+        async def poll(bridge_id):
+            try:
+                await self._poll(bridge_id)
+            finally:
+                slots.release()
+                self._wakeup.set()
+
+        while self._tracked:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._due and self._due[0][0] <= now:
+                _, _, bridge_id = heapq.heappop(self._due)
+                await slots.acquire()
+                task = asyncio.create_task(poll(bridge_id))
+                polls.add(task)
+                task.add_done_callback(polls.discard)
+            timeout = self._due[0][0] - time.monotonic() if self._due else None
+            try:
+                # sleep until the next bridge is due or a new one is tracked
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
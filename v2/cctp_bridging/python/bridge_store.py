@@ -0,0 +1,166 @@
+"""Durable state of CCTP bridges, so a crash between burn and mint loses nothing.
+
+Every bridge is one row of a SQLite table, written (and committed) as soon as
+something about it is known: the burn hash once the burn is signed (before it
+is broadcast), the attestation state, the mint hash once the mint is signed.
+A restart only has to look at the rows that are not finished yet:
+
+    BURN_SENT -> BURNT -> MINT_SENT -> MINTED
+                       \\-> COMPLETED (someone else minted)
+    any step can end in FAILED
+
+``pending()`` reads the unfinished rows through an index on ``status``, so it
+stays fast with tens of thousands of finished bridges in the file. Without a
+path the file is ``~/.compass/bridges.sqlite3``, whatever directory a script
+runs from.
+
+    store = BridgeStore()
+    store.add(bridge_id, owner, amount, source, destination, BURN_SENT,
+              burn_tx_hash=tx_hash)
+    store.update(bridge_id, status=BURNT)
+    for bridge in store.pending(): ...
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+BURN_SENT = "burn_sent"
+BURNT = "burnt"
+MINT_SENT = "mint_sent"
+MINTED = "minted"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# bridges a restart has to pick up again
+PENDING = (BURN_SENT, BURNT, MINT_SENT)
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".compass", "bridges.sqlite3")
+
+FIELDS = (
+    "bridge_id",
+    "owner",
+    "amount",
+    "source",
+    "destination",
+    "status",
+    "attestation",
+    "burn_tx_hash",
+    "mint_tx_hash",
+    "timings",
+    "error",
+    "created_at",
+    "updated_at",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bridges (
+    bridge_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attestation TEXT,
+    burn_tx_hash TEXT,
+    mint_tx_hash TEXT,
+    timings TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bridges_status ON bridges (status);
+"""
+
+
+class BridgeStore:
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        # WAL: a commit is one sequential append, and readers never block it
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def add(self, bridge_id, owner, amount, source, destination, status, **fields):
+        now = time.time()
+        row = {
+            "bridge_id": bridge_id,
+            "owner": owner,
+            "amount": str(amount),
+            "source": str(getattr(source, "value", source)),
+            "destination": str(getattr(destination, "value", destination)),
+            "status": status,
+            "created_at": now,
+            "updated_at": now,
+            **_encode(fields),
+        }
+        _check(row)
+        with self.db:
+            self.db.execute(
+                f"INSERT INTO bridges ({', '.join(row)}) "
+                f"VALUES ({', '.join('?' * len(row))})",
+                list(row.values()),
+            )
+
+    def update(self, bridge_id, **fields):
+        fields = {**_encode(fields), "updated_at": time.time()}
+        _check(fields)
+        with self.db:
+            self.db.execute(
+                f"UPDATE bridges SET {', '.join(f'{k} = ?' for k in fields)} "
+                "WHERE bridge_id = ?",
+                [*fields.values(), bridge_id],
+            )
+
+    def get(self, bridge_id):
+        row = self.db.execute(
+            "SELECT * FROM bridges WHERE bridge_id = ?", (bridge_id,)
+        ).fetchone()
+        return _decode(row) if row else None
+
+    def pending(self):
+        """Unfinished bridges, oldest first."""
+        placeholders = ", ".join("?" * len(PENDING))
+        rows = self.db.execute(
+            f"SELECT * FROM bridges WHERE status IN ({placeholders}) "
+            "ORDER BY created_at",
+            PENDING,
+        )
+        return [_decode(row) for row in rows]
+
+    def counts(self):
+        """Number of bridges per status."""
+        rows = self.db.execute("SELECT status, COUNT(*) FROM bridges GROUP BY status")
+        return dict(rows.fetchall())
+
+
+def _check(fields):
+    # the names go into the SQL text, so only columns of the table may pass
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"unknown bridge fields: {sorted(unknown)}")
+
+
+def _encode(fields):
+    if "timings" in fields:
+        fields = {**fields, "timings": json.dumps(fields["timings"])}
+    return fields
+
+
+def _decode(row):
+    bridge = dict(row)
+    bridge["timings"] = json.loads(bridge["timings"]) if bridge["timings"] else {}
+    return bridge
@@ -1,6 +1,7 @@
 # SNIPPET START 1
 from compass_api_sdk import CompassAPI, models
 import os
+import random
 from dotenv import load_dotenv
 from web3 import Web3
 import time
@@ -14,6 +15,29 @@ BASE_RPC_URL = os.getenv("BASE_RPC_URL")
 ARBITRUM_RPC_URL = os.getenv("ARBITRUM_RPC_URL")
 # SNIPPET END 1
 
+# Shared helpers of the examples in this repo, outside of the documented snippets
+from attestation import state_of
+from bridge_store import (
+    BURN_SENT,
+    BURNT,
+    COMPLETED,
+    FAILED,
+    MINT_SENT,
+    MINTED,
+    BridgeStore,
+)
+
+# every step is recorded here; `python orchestrator.py --resume` finishes a
+# bridge this script left behind
+store = BridgeStore(os.getenv("BRIDGE_STORE"))
+
+
+def signed_hash(w3, tx):
+    # signatures are deterministic (RFC 6979), so this is the hash of the
+    # transaction the next snippet signs and broadcasts
+    return w3.to_hex(w3.eth.account.sign_transaction(tx, PRIVATE_KEY).hash)
+
+
 # SNIPPET START 2
 with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
 
@@ -39,6 +63,19 @@ with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
     print(f"Bridge ID: {burn_response.bridge_id}")
 # SNIPPET END 3
 
+    # record the burn hash before it is broadcast, so a crash cannot lose it
+    store.add(
+        burn_response.bridge_id,
+        WALLET_ADDRESS,
+        "1",
+        models.Chain.BASE,
+        models.Chain.ARBITRUM,
+        BURN_SENT,
+        burn_tx_hash=signed_hash(
+            base_w3, burn_response.model_dump(by_alias=True)["transaction"]
+        ),
+    )
+
 # SNIPPET START 4
     # Sign and broadcast burn transaction
     burn_tx_dict = burn_response.model_dump(by_alias=True)["transaction"]
@@ -53,48 +90,66 @@ with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
     print("✓ Burn transaction complete!\n")
 # SNIPPET END 4
 
+    # a reverted burn burnt nothing, so there is no attestation to wait for
+    if burn_receipt.status != 1:
+        store.update(burn_response.bridge_id, status=FAILED, error="burn reverted")
+        raise Exception(f"Burn reverted: {base_w3.to_hex(burn_tx_hash)}")
+    store.update(burn_response.bridge_id, status=BURNT)
+
 # SNIPPET START 5
     # Step 2: Wait for attestation and prepare mint
     print("Step 2: Waiting for Circle attestation...\n")
 
-    POLL_INTERVAL_SECONDS = 10
-    MAX_ATTEMPTS = 60  # 10 minutes max
+    # Wait as long as Circle estimates, then back off exponentially up to one
+    # poll a minute. The random jitter keeps bridges burnt together from
+    # polling in lockstep.
+    MAX_POLL_INTERVAL_SECONDS = 60
+    TIMEOUT_SECONDS = 30 * 60
 
-    mint_response = None
-    attempts = 0
-
-    while attempts < MAX_ATTEMPTS:
-        attempts += 1
-        print(f"Polling for attestation (attempt {attempts}/{MAX_ATTEMPTS})...")
+    started = time.monotonic()
+    attempt = 0
 
+    while True:
         mint_response = compass_api.bridge.cctp_mint(
             bridge_id=burn_response.bridge_id,
             burn_tx_hash=base_w3.to_hex(burn_tx_hash),
             sender=WALLET_ADDRESS,
         )
 
-        # Check if transaction is ready (has transaction field) or completed
-        if hasattr(mint_response, 'transaction') and mint_response.transaction:
+        if isinstance(mint_response, models.MintPrepareReadyResponse):
             print("Attestation received! Ready to mint.\n")
             break
-
-        # Check response type to determine status
-        response_type = type(mint_response).__name__
-        if "Completed" in response_type:
+        if isinstance(mint_response, models.MintPrepareCompletedResponse):
             print("Bridge already completed!\n")
             break
 
-        print(f"Status: pending. Waiting {POLL_INTERVAL_SECONDS}s before retry...")
-        time.sleep(POLL_INTERVAL_SECONDS)
-
-    if attempts >= MAX_ATTEMPTS:
-        raise Exception("Attestation not ready after maximum attempts")
+        delay = min(5 * 1.6**attempt, MAX_POLL_INTERVAL_SECONDS)
+        if attempt == 0:
+            delay = max(delay, mint_response.estimated_wait_seconds)
+        delay *= 1 - random.uniform(0, 0.2)
+        elapsed = time.monotonic() - started
+        if elapsed + delay > TIMEOUT_SECONDS:
+            raise Exception(f"Attestation not ready after {elapsed:.0f}s")
+
+        print(f"Status after {elapsed:.0f}s: pending. Retrying in {delay:.0f}s...")
+        time.sleep(delay)
+        attempt += 1
 # SNIPPET END 5
 
+    store.update(burn_response.bridge_id, attestation=state_of(mint_response))
+    if isinstance(mint_response, models.MintPrepareReadyResponse):
+        # as with the burn: the mint hash is on record before the broadcast
+        store.update(
+            burn_response.bridge_id,
+            status=MINT_SENT,
+            mint_tx_hash=signed_hash(
+                arbitrum_w3, mint_response.model_dump(by_alias=True)["transaction"]
+            ),
+        )
+
 # SNIPPET START 6
     # Step 3: Execute mint on Arbitrum (destination chain)
-    response_type = type(mint_response).__name__
-    if "Completed" not in response_type:
+    if isinstance(mint_response, models.MintPrepareReadyResponse):
         print("Step 3: Executing mint on Arbitrum...\n")
 
         mint_tx_dict = mint_response.model_dump(by_alias=True)["transaction"]
@@ -109,6 +164,16 @@ with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
         print("✓ Mint transaction complete!\n")
 # SNIPPET END 6
 
+    if not isinstance(mint_response, models.MintPrepareReadyResponse):
+        store.update(burn_response.bridge_id, status=COMPLETED)
+    elif mint_receipt.status == 1:
+        store.update(burn_response.bridge_id, status=MINTED)
+    else:
+        store.update(burn_response.bridge_id, status=FAILED, error="mint reverted")
+        raise Exception(f"Mint reverted: {arbitrum_w3.to_hex(mint_tx_hash)}")
+
     print("=== Bridge Complete ===")
     print(f"Successfully bridged USDC from Base to Arbitrum")
     print(f"Bridge ID: {burn_response.bridge_id}")
+
+store.close()
@@ -0,0 +1,92 @@
+"""asyncio version of main.py: bridge USDC from Base to Arbitrum for any
+number of wallets at once, driven by one event loop.
+
+A bridge spends most of its time waiting for Circle's attestation; here all
+bridges are polled by one ``AttestationScheduler`` task instead of a blocked
+thread each, so thousands of bridges can be in flight together.
+"""
+
+import asyncio
+import os
+
+from compass_api_sdk import CompassAPI, models
+from compass_common import AsyncTxSubmitter
+from dotenv import load_dotenv
+from eth_account import Account
+from web3 import AsyncWeb3
+
+from attestation import COMPLETED, AttestationScheduler
+
+load_dotenv()
+
+COMPASS_API_KEY = os.getenv("COMPASS_API_KEY")
+# comma-separated; one bridge runs per key
+PRIVATE_KEYS = (os.getenv("PRIVATE_KEYS") or os.getenv("PRIVATE_KEY")).split(",")
+BASE_RPC_URL = os.getenv("BASE_RPC_URL")
+ARBITRUM_RPC_URL = os.getenv("ARBITRUM_RPC_URL")
+MAX_CONCURRENT_FLOWS = int(os.getenv("MAX_CONCURRENT_FLOWS", "1000"))
+
+
+async def bridge_flow(
+    compass_api, attestations, base_w3, arbitrum_w3, private_key, amount="1"
+):
+    wallet_address = Account.from_key(private_key).address
+
+    # Step 1: Burn USDC on Base (source chain)
+    burn_response = await compass_api.bridge.cctp_burn_async(
+        owner=wallet_address,
+        chain=models.Chain.BASE,
+        amount=amount,
+        destination_chain=models.Chain.ARBITRUM,
+        gas_sponsorship=False,
+    )
+    burn_receipt = await AsyncTxSubmitter(base_w3, private_key).send(burn_response)
+    burn_tx_hash = AsyncWeb3.to_hex(burn_receipt["transactionHash"])
+    print(f"[{burn_response.bridge_id}] burn confirmed: {burn_tx_hash}")
+
+    # Step 2: Wait for attestation and prepare mint
+    attestation = await attestations.track(
+        burn_response.bridge_id, burn_tx_hash, wallet_address
+    )
+    print(f"[{burn_response.bridge_id}] attestation: {attestation.timings}")
+    if attestation.state == COMPLETED:
+        print(f"[{burn_response.bridge_id}] bridge already completed")
+        return burn_response.bridge_id, burn_tx_hash, None
+
+    # Step 3: Execute mint on Arbitrum (destination chain)
+    mint_receipt = await AsyncTxSubmitter(arbitrum_w3, private_key).send(
+        attestation.response
+    )
+    mint_tx_hash = AsyncWeb3.to_hex(mint_receipt["transactionHash"])
+    print(f"[{burn_response.bridge_id}] mint confirmed: {mint_tx_hash}")
+    return burn_response.bridge_id, burn_tx_hash, mint_tx_hash
+
+
+async def main():
+    base_w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(BASE_RPC_URL))
+    arbitrum_w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(ARBITRUM_RPC_URL))
+    limit = asyncio.Semaphore(MAX_CONCURRENT_FLOWS)
+
+    print("=== CCTP Bridge: Base -> Arbitrum ===\n")
+    async with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
+        attestations = AttestationScheduler(compass_api)
+
+        async def run(private_key):
+            async with limit:
+                return await bridge_flow(
+                    compass_api, attestations, base_w3, arbitrum_w3, private_key
+                )
+
+        results = await asyncio.gather(
+            *(run(key.strip()) for key in PRIVATE_KEYS), return_exceptions=True
+        )
+
+    print("\n=== Bridges Complete ===")
+    for key, result in zip(PRIVATE_KEYS, results):
+        print(Account.from_key(key.strip()).address, result)
+    if any(isinstance(result, Exception) for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
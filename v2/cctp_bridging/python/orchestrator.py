@@ -0,0 +1,350 @@
+"""Bridge a whole queue of USDC transfers across chains at once.
+
+``main.py`` bridges one amount from Base to Arbitrum and opens a fresh client
+per chain. ``BridgeOrchestrator`` takes a list of bridges
+
+    {"owner": "0x...", "amount": "1", "source": "base", "destination": "arbitrum"}
+
+and runs them together:
+
+- the burns of every source chain are built concurrently, sent back to back
+  with locally counted nonces (one ``AsyncTxSubmitter`` per wallet and chain)
+  and confirmed together,
+- every burnt bridge is handed to one ``AttestationScheduler``,
+- each mint is sent on its destination chain as soon as its attestation is
+  ready, by the owner's submitter for that chain.
+
+All RPC traffic of a chain goes through one ``AsyncWeb3`` whose aiohttp
+session keeps up to ``connections_per_chain`` connections alive, so the n-th
+transaction of a run does not pay for a TCP and TLS handshake.
+
+A bridge that fails does not stop the others; its ``error`` is recorded in its
+result. With a ``BridgeStore`` every step is persisted as it happens, and
+``resume()`` finishes the bridges a crashed run left behind.
+
+    python orchestrator.py bridges.example.json
+    python orchestrator.py --resume
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import aiohttp
+from compass_api_sdk import CompassAPI
+from compass_common import AsyncTxSubmitter
+from dotenv import load_dotenv
+from eth_account import Account
+from web3 import AsyncWeb3
+from web3.exceptions import TransactionNotFound
+
+from attestation import READY, AttestationScheduler
+from bridge_store import (
+    BURN_SENT,
+    BURNT,
+    COMPLETED,
+    FAILED,
+    MINT_SENT,
+    MINTED,
+    BridgeStore,
+)
+
+
+class ChainPool:
+    """One ``AsyncWeb3`` per chain, each on a pooled keep-alive session."""
+
+    def __init__(self, rpc_urls, connections_per_chain=100, keepalive_timeout=60):
+        self.rpc_urls = rpc_urls
+        self.connections_per_chain = connections_per_chain
+        self.keepalive_timeout = keepalive_timeout
+        self._web3 = {}
+        self._sessions = []
+        self._lock = asyncio.Lock()
+
+    async def web3(self, chain):
+        chain = str(getattr(chain, "value", chain))
+        async with self._lock:
+            if chain not in self._web3:
+                if chain not in self.rpc_urls:
+                    raise ValueError(f"no RPC URL for chain {chain}")
+                provider = AsyncWeb3.AsyncHTTPProvider(self.rpc_urls[chain])
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=self.connections_per_chain,
+                        keepalive_timeout=self.keepalive_timeout,
+                    )
+                )
+                await provider.cache_async_session(session)
+                self._sessions.append(session)
+                self._web3[chain] = AsyncWeb3(provider)
+            return self._web3[chain]
+
+    async def close(self):
+        for session in self._sessions:
+            await session.close()
+        self._sessions = []
+        self._web3 = {}
+
+
+class BridgeOrchestrator:
+    def __init__(
+        self,
+        compass,
+        private_keys,
+        rpc_urls,
+        attestations=None,
+        max_in_flight=50,
+        connections_per_chain=100,
+        store=None,
+    ):
+        self.compass = compass
+        # BridgeStore: optional, makes the run resumable after a crash
+        self.store = store
+        # owner address (lowercase) -> private key
+        self.signers = {
+            Account.from_key(key).address.lower(): key for key in private_keys
+        }
+        self.chains = ChainPool(rpc_urls, connections_per_chain)
+        self.attestations = attestations or AttestationScheduler(compass)
+        self._api_slots = asyncio.Semaphore(max_in_flight)
+        self._submitters = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self.chains.close()
+
+    async def _submitter(self, chain, owner):
+        key = (str(getattr(chain, "value", chain)), owner.lower())
+        if key not in self._submitters:
+            if owner.lower() not in self.signers:
+                raise ValueError(f"no private key for owner {owner}")
+            self._submitters[key] = AsyncTxSubmitter(
+                await self.chains.web3(chain), self.signers[owner.lower()]
+            )
+        return self._submitters[key]
+
+    def _save(self, result, **fields):
+        result.update(fields)
+        if self.store is not None:
+            self.store.update(result["bridge_id"], **fields)
+
+    async def run(self, bridges):
+        """Run every bridge and return one result dict per bridge, in order."""
+        results = [
+            {
+                **bridge,
+                "bridge_id": None,
+                "status": None,
+                "attestation": None,
+                "burn_tx_hash": None,
+                "mint_tx_hash": None,
+                "timings": {},
+                "error": None,
+            }
+            for bridge in bridges
+        ]
+        by_source = {}
+        for result in results:
+            by_source.setdefault(result["source"], []).append(result)
+        # the source chains are independent: burn on all of them at once
+        await asyncio.gather(
+            *(self._run_source(source, batch) for source, batch in by_source.items())
+        )
+        return results
+
+    async def resume(self):
+        """Finish the bridges ``store`` has left unfinished, e.g. after a crash."""
+        results = self.store.pending()
+        await asyncio.gather(*(self._resume(result) for result in results))
+        return results
+
+    async def _burn(self, result):
+        async with self._api_slots:
+            return await self.compass.bridge.cctp_burn_async(
+                owner=result["owner"],
+                chain=result["source"],
+                amount=result["amount"],
+                destination_chain=result["destination"],
+                gas_sponsorship=False,
+            )
+
+    def _burn_signed(self, result, tx_hash):
+        result.update(status=BURN_SENT, burn_tx_hash=tx_hash)
+        if self.store is not None:
+            self.store.add(
+                result["bridge_id"],
+                result["owner"],
+                result["amount"],
+                result["source"],
+                result["destination"],
+                BURN_SENT,
+                burn_tx_hash=tx_hash,
+            )
+
+    async def _run_source(self, source, batch):
+        responses = await asyncio.gather(
+            *(self._burn(result) for result in batch), return_exceptions=True
+        )
+
+        # send every burn of this chain before waiting for any of them
+        sent = {}  # submitter -> [result]
+        for result, response in zip(batch, responses):
+            if isinstance(response, Exception):
+                result.update(status=FAILED, error=repr(response))
+                continue
+            result["bridge_id"] = response.bridge_id
+            try:
+                submitter = await self._submitter(source, result["owner"])
+                await submitter.submit(
+                    response,
+                    on_signed=lambda tx_hash, result=result: self._burn_signed(
+                        result, tx_hash
+                    ),
+                )
+            except Exception as e:
+                if result["status"] is None:
+                    result.update(status=FAILED, error=repr(e))
+                else:
+                    self._save(result, status=FAILED, error=repr(e))
+                continue
+            sent.setdefault(submitter, []).append(result)
+
+        confirmations = await asyncio.gather(
+            *(self._confirm_burns(*item) for item in sent.items())
+        )
+        await asyncio.gather(
+            *(self._complete(result) for burnt in confirmations for result in burnt)
+        )
+
+    async def _confirm_burns(self, submitter, results):
+        """Wait for the burns of ``results``; returns the ones that were mined."""
+        try:
+            receipts = await submitter.confirm(
+                [result["burn_tx_hash"] for result in results], raise_on_revert=False
+            )
+        except Exception as e:
+            # still BURN_SENT: resume() picks these up again
+            for result in results:
+                self._save(result, error=repr(e))
+            return []
+        burnt = []
+        for result, receipt in zip(results, receipts):
+            if receipt["status"] == 1:
+                self._save(result, status=BURNT)
+                burnt.append(result)
+            else:
+                self._save(result, status=FAILED, error="burn reverted")
+        return burnt
+
+    async def _complete(self, result):
+        try:
+            attestation = await self.attestations.track(
+                result["bridge_id"], result["burn_tx_hash"], result["owner"]
+            )
+            self._save(
+                result, attestation=attestation.state, timings=attestation.timings
+            )
+            if attestation.state != READY:
+                # already minted by someone else
+                self._save(result, status=COMPLETED)
+                return
+            submitter = await self._submitter(result["destination"], result["owner"])
+            tx_hash = await submitter.submit(
+                attestation.response,
+                on_signed=lambda tx_hash: self._save(
+                    result, status=MINT_SENT, mint_tx_hash=tx_hash
+                ),
+            )
+            await self._confirm_mint(submitter, result, tx_hash)
+        except Exception as e:
+            # the status tells resume() where to carry on
+            self._save(result, error=repr(e))
+
+    async def _confirm_mint(self, submitter, result, tx_hash):
+        [receipt] = await submitter.confirm([tx_hash], raise_on_revert=False)
+        if receipt["status"] == 1:
+            self._save(result, status=MINTED, error=None)
+        else:
+            self._save(result, status=FAILED, error="mint reverted")
+
+    async def _broadcast(self, chain, tx_hash):
+        """Whether the node knows ``tx_hash`` (it was broadcast before a crash)."""
+        try:
+            await (await self.chains.web3(chain)).eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            return False
+        return True
+
+    async def _resume(self, result):
+        try:
+            if result["status"] == BURN_SENT:
+                if not await self._broadcast(result["source"], result["burn_tx_hash"]):
+                    self._save(result, status=FAILED, error="burn never broadcast")
+                    return
+                submitter = await self._submitter(result["source"], result["owner"])
+                if not await self._confirm_burns(submitter, [result]):
+                    return
+            if result["status"] == MINT_SENT and await self._broadcast(
+                result["destination"], result["mint_tx_hash"]
+            ):
+                submitter = await self._submitter(
+                    result["destination"], result["owner"]
+                )
+                await self._confirm_mint(submitter, result, result["mint_tx_hash"])
+                return
+        except Exception as e:
+            self._save(result, error=repr(e))
+            return
+        # BURNT, or a mint that was signed but never broadcast: mint (again)
+        await self._complete(result)
+
+
+def rpc_urls_from_env():
+    """``<CHAIN>_RPC_URL`` environment variables, e.g. ``BASE_RPC_URL``."""
+    return {
+        name.removesuffix("_RPC_URL").lower(): url
+        for name, url in os.environ.items()
+        if name.endswith("_RPC_URL") and url
+    }
+
+
+async def main(args):
+    load_dotenv()
+    private_keys = [
+        key.strip()
+        for key in (os.getenv("PRIVATE_KEYS") or os.getenv("PRIVATE_KEY")).split(",")
+    ]
+    resume = args[:1] == ["--resume"]
+    if not resume:
+        with open(args[0] if args else "bridges.example.json") as f:
+            bridges = json.load(f)
+        owners = [Account.from_key(key).address for key in private_keys]
+        for bridge in bridges:
+            # "owner" may be left out when there is a single key
+            bridge.setdefault("owner", owners[0])
+
+    with BridgeStore(os.getenv("BRIDGE_STORE")) as store:
+        async with CompassAPI(api_key_auth=os.getenv("COMPASS_API_KEY")) as compass_api:
+            async with BridgeOrchestrator(
+                compass_api, private_keys, rpc_urls_from_env(), store=store
+            ) as orchestrator:
+                if resume:
+                    results = await orchestrator.resume()
+                else:
+                    results = await orchestrator.run(bridges)
+        print(f"bridges by status: {store.counts()}")
+
+    for result in results:
+        print(json.dumps(result, default=str))
+    if any(result["error"] for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,157 @@
+"""Create the Earn Accounts of a whole cohort of owners in one run.
+
+``main.py`` creates one account and waits for its receipt. Here the wallet in
+``PRIVATE_KEY`` pays for the accounts of every owner in a file (one address
+per line, or a JSON list):
+
+1. owners that already have an account in the local ``EarnAccountRegistry``
+   are skipped, without any API or RPC call. Owners whose create transaction
+   an earlier run sent but did not see confirmed are checked on chain first,
+   and only created again if that transaction failed or was dropped,
+2. the ``earn_create_account`` calls of the others run concurrently,
+3. the create transactions go out back to back with locally counted nonces
+   (``AsyncTxSubmitter``) and are confirmed together,
+4. every ``earn_account_address`` is recorded in the registry: the hash
+   before broadcasting, the outcome once confirmed. An owner for whom the
+   API has no transaction already has an account and is recorded as such.
+   A transaction whose confirmation times out stays ``PENDING`` for the next
+   run to check.
+
+    python bulk_create.py owners.txt
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+from compass_api_sdk import CompassAPI, models
+from compass_common import AsyncTxSubmitter, EarnAccountRegistry
+from compass_common.earn_accounts import CREATED, EXISTS, FAILED, PENDING
+from dotenv import load_dotenv
+from web3 import AsyncWeb3
+from web3.exceptions import TransactionNotFound
+
+CHAIN = models.CreateAccountRequestChain.BASE
+
+
+def read_owners(path):
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+async def recheck(w3, address, tx_hash):
+    """Status of an account whose create transaction an earlier run sent."""
+    if await w3.eth.get_code(AsyncWeb3.to_checksum_address(address)):
+        return CREATED
+    if tx_hash is None:
+        return FAILED
+    try:
+        receipt = await w3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        try:
+            await w3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            return FAILED  # dropped: nothing will create the account
+        return PENDING  # still in the mempool
+    return CREATED if receipt["status"] == 1 else FAILED
+
+
+async def provision(compass_api, submitter, registry, owners, max_in_flight=50):
+    """Create the accounts of ``owners``; returns {owner: status or "skipped"}."""
+    todo = registry.missing(owners, CHAIN)
+    # already in the registry: nothing to ask the API or the chain
+    results = dict.fromkeys(owners, "skipped")
+    slots = asyncio.Semaphore(max_in_flight)
+
+    sent_before = registry.pending(CHAIN)
+    in_flight = [owner for owner in todo if owner.lower() in sent_before]
+    statuses = await asyncio.gather(
+        *(recheck(submitter.w3, *sent_before[owner.lower()]) for owner in in_flight)
+    )
+    for owner, status in zip(in_flight, statuses):
+        address, tx_hash = sent_before[owner.lower()]
+        if status == CREATED:
+            registry.add(owner, CHAIN, address, CREATED, tx_hash)
+        if status != FAILED:
+            # created meanwhile, or still on its way: do not create it twice
+            results[owner] = status
+            todo.remove(owner)
+
+    async def request(owner):
+        async with slots:
+            return await compass_api.earn.earn_create_account_async(
+                chain=CHAIN,
+                sender=submitter.address,
+                owner=owner,
+                estimate_gas=True,
+            )
+
+    responses = await asyncio.gather(
+        *(request(owner) for owner in todo), return_exceptions=True
+    )
+
+    sent = []  # (owner, earn account address, tx hash)
+    for owner, response in zip(todo, responses):
+        if isinstance(response, Exception):
+            results[owner] = FAILED
+            print(f"{owner}: {response!r}")
+            continue
+        address = response.earn_account_address
+        if response.transaction is None:
+            registry.add(owner, CHAIN, address, EXISTS)
+            results[owner] = EXISTS
+            continue
+        try:
+            tx_hash = await submitter.submit(
+                response,
+                on_signed=lambda tx_hash, owner=owner, address=address: registry.add(
+                    owner, CHAIN, address, PENDING, tx_hash
+                ),
+            )
+        except Exception as e:
+            registry.add(owner, CHAIN, address, FAILED)
+            results[owner] = FAILED
+            print(f"{owner}: {e!r}")
+            continue
+        sent.append((owner, address, tx_hash))
+
+    # confirmed one by one: a timeout leaves its own row pending only
+    confirmations = await asyncio.gather(
+        *(submitter.confirm([tx_hash], raise_on_revert=False) for _, _, tx_hash in sent),
+        return_exceptions=True,
+    )
+    for (owner, address, tx_hash), result in zip(sent, confirmations):
+        if isinstance(result, Exception):
+            # the row is already PENDING with its hash; the next run checks it
+            results[owner] = PENDING
+            print(f"{owner}: {result!r}")
+            continue
+        [receipt] = result
+        status = CREATED if receipt["status"] == 1 else FAILED
+        registry.add(owner, CHAIN, address, status, tx_hash)
+        results[owner] = status
+    return results
+
+
+async def main(args):
+    load_dotenv()
+    owners = read_owners(args[0] if args else "owners.txt")
+    w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(os.getenv("BASE_RPC_URL")))
+    submitter = AsyncTxSubmitter(w3, os.getenv("PRIVATE_KEY"))
+
+    with EarnAccountRegistry(os.getenv("EARN_ACCOUNT_REGISTRY")) as registry:
+        async with CompassAPI(api_key_auth=os.getenv("COMPASS_API_KEY")) as compass_api:
+            results = await provision(compass_api, submitter, registry, owners)
+        for owner, status in results.items():
+            print(owner, status, registry.get(owner, CHAIN))
+        print(f"accounts by status: {registry.counts(CHAIN)}")
+    if FAILED in results.values():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
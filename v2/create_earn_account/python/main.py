@@ -12,6 +12,13 @@ PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 BASE_RPC_URL = os.getenv("BASE_RPC_URL")
 # SNIPPET END 1
 
+# Shared helpers of the examples in this repo, outside of the documented snippets
+from compass_common import EarnAccountRegistry
+from compass_common.earn_accounts import CREATED, FAILED
+
+# ~/.compass/earn_accounts.sqlite3 unless EARN_ACCOUNT_REGISTRY names another file
+registry = EarnAccountRegistry(os.getenv("EARN_ACCOUNT_REGISTRY"))
+
 # SNIPPET START 2
 with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
 # SNIPPET END 2
@@ -36,3 +43,15 @@ with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
     print("Earn Account Address:", create_account_response.earn_account_address)
 # SNIPPET END 4
 
+    # Remember the new account, so bulk_create.py skips this owner; a reverted
+    # creation is recorded as failed and retried by the next run
+    receipt = w3.eth.get_transaction_receipt(tx_hash)
+    registry.add(
+        WALLET_ADDRESS,
+        models.CreateAccountRequestChain.BASE,
+        create_account_response.earn_account_address,
+        CREATED if receipt["status"] == 1 else FAILED,
+        w3.to_hex(tx_hash),
+    )
+
+registry.close()
@@ -0,0 +1,222 @@
+"""Allocate many portfolios across thousands of Earn vaults in one computation.
+
+``main.py`` takes the single best vault by one sort key. ``VaultAllocator``
+works on the whole vault table (``VaultCache.load()``, or ``to_table`` of an
+``earn_vaults`` response):
+
+1. every vault gets one score: the weighted mean of its percentile rank in
+   each metric of ``weights`` (a missing value ranks last),
+2. every portfolio may only use vaults on its chain, of its underlying token
+   and with at least ``min_tvl_usd`` of TVL,
+3. each portfolio fills its best eligible vaults, at most ``max_share`` of the
+   portfolio per vault and at most ``max_vaults`` vaults; what does not fit
+   stays idle,
+4. the difference between target and current positions becomes ``earn_manage``
+   actions, withdrawals first so they fund the deposits.
+
+Steps 2 to 4 run on (portfolios x vaults) NumPy arrays, so a thousand
+portfolios over five thousand vaults are a handful of array operations on
+arrays of 5 million cells (40 MB each).
+
+    allocator = VaultAllocator(cache.load(), min_tvl_usd=1_000_000)
+    portfolios = [Portfolio(owner, "base", "USDC", cash=1000, positions={...})]
+    for action in allocator.actions(portfolios):
+        compass_api.earn.earn_manage(**action)
+"""
+
+import os
+
+import numpy as np
+from compass_api_sdk import CompassAPI, models
+from dotenv import load_dotenv
+
+from vault_scanner import VaultCache, VaultScanner
+
+DEFAULT_WEIGHTS = {
+    "one_month_cagr_net": 0.5,
+    "three_months_cagr_net": 0.3,
+    "three_months_sharpe_net": 0.2,
+}
+
+
+class Portfolio:
+    def __init__(self, owner, chain, asset_symbol, cash=0, positions=None):
+        self.owner = owner
+        self.chain = str(getattr(chain, "value", chain))
+        self.asset_symbol = asset_symbol
+        # idle amount of the underlying token, in token units
+        self.cash = float(cash)
+        # vault address -> amount of the underlying token held in the vault
+        self.positions = positions or {}
+
+
+def _column(table, name):
+    if name not in table.column_names:
+        raise ValueError(f"vault table has no column {name!r}")
+    return table[name].to_numpy(zero_copy_only=False)
+
+
+def _codes(vault_values, portfolio_values):
+    """Integer codes for both sides, equal where the (lowercase) strings are."""
+    vault_values = np.char.lower(np.asarray(vault_values, dtype=str))
+    portfolio_values = np.char.lower(np.asarray(portfolio_values, dtype=str))
+    _, codes = np.unique(
+        np.concatenate([vault_values, portfolio_values]), return_inverse=True
+    )
+    return codes[: len(vault_values)], codes[len(vault_values) :]
+
+
+def percentile_ranks(values):
+    """Rank of each value among the others, from 0 (worst) to 1 (best); NaN is 0."""
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    ranks = np.zeros(len(values))
+    count = valid.sum()
+    if count > 1:
+        order = np.argsort(values[valid], kind="stable")
+        valid_ranks = np.empty(count)
+        valid_ranks[order] = np.arange(count) / (count - 1)
+        ranks[valid] = valid_ranks
+    elif count == 1:
+        ranks[valid] = 1.0
+    return ranks
+
+
+class VaultAllocator:
+    def __init__(
+        self,
+        vaults,
+        weights=None,
+        min_tvl_usd=0,
+        max_share=0.25,
+        max_vaults=None,
+    ):
+        # a pyarrow.Table with one row per vault
+        self.vaults = vaults
+        self.weights = DEFAULT_WEIGHTS if weights is None else weights
+        self.min_tvl_usd = min_tvl_usd
+        self.max_share = max_share
+        self.max_vaults = max_vaults
+        self.addresses = np.asarray(_column(vaults, "vault_address"), dtype=str)
+        self._column = {
+            address.lower(): i for i, address in enumerate(self.addresses)
+        }
+
+    def scores(self):
+        """One score per vault, from 0 to 1."""
+        total = sum(self.weights.values())
+        score = np.zeros(self.vaults.num_rows)
+        for metric, weight in self.weights.items():
+            values = _column(self.vaults, metric).astype(float)
+            score += weight / total * percentile_ranks(values)
+        return score
+
+    def _matches(self, portfolios):
+        """Boolean (portfolios x vaults): same chain and underlying token."""
+        vault_chains, chains = _codes(
+            _column(self.vaults, "chain"), [p.chain for p in portfolios]
+        )
+        vault_assets, assets = _codes(
+            _column(self.vaults, "asset_symbol"), [p.asset_symbol for p in portfolios]
+        )
+        return (chains[:, None] == vault_chains[None, :]) & (
+            assets[:, None] == vault_assets[None, :]
+        )
+
+    def eligible(self, portfolios):
+        """Boolean (portfolios x vaults): which vault each portfolio may use."""
+        eligible = self._matches(portfolios)
+        if self.min_tvl_usd:
+            tvl = np.nan_to_num(_column(self.vaults, "tvl_usd").astype(float))
+            eligible &= (tvl >= self.min_tvl_usd)[None, :]
+        return eligible
+
+    def positions(self, portfolios):
+        """(portfolios x vaults) current amounts.
+
+        Positions in vaults missing from the table, or of another chain or
+        token than the portfolio's, are left out (and left alone).
+        """
+        current = np.zeros((len(portfolios), self.vaults.num_rows))
+        for row, portfolio in enumerate(portfolios):
+            for address, amount in portfolio.positions.items():
+                column = self._column.get(address.lower())
+                if column is not None:
+                    current[row, column] = float(amount)
+        return current * self._matches(portfolios)
+
+    def weights_of(self, portfolios):
+        """(portfolios x vaults) target share of each portfolio in each vault."""
+        eligible = self.eligible(portfolios)
+        ranked = np.where(eligible, self.scores()[None, :], -np.inf)
+        # best vault first; ineligible ones (-inf) sort behind all eligible ones
+        order = np.argsort(-ranked, axis=1, kind="stable")
+        place = np.arange(ranked.shape[1])
+        # fill max_share per vault until the portfolio is fully allocated
+        share = np.clip(1 - place * self.max_share, 0, self.max_share)
+        if self.max_vaults is not None:
+            share[self.max_vaults :] = 0
+        sorted_shares = share[None, :] * np.take_along_axis(eligible, order, axis=1)
+        weights = np.zeros_like(ranked)
+        np.put_along_axis(weights, order, sorted_shares, axis=1)
+        return weights
+
+    def targets(self, portfolios, current=None):
+        """(portfolios x vaults) target amounts of the underlying token."""
+        if current is None:
+            current = self.positions(portfolios)
+        capital = np.array([p.cash for p in portfolios]) + current.sum(axis=1)
+        return self.weights_of(portfolios) * capital[:, None]
+
+    def actions(self, portfolios, min_trade=1.0, decimals=6):
+        """``earn_manage`` keyword arguments that move every portfolio to target.
+
+        Moves smaller than ``min_trade`` (in token units) are skipped. Amounts
+        are rounded down to ``decimals``, so a withdrawal never asks for more
+        than the position and a deposit never spends more than is there.
+        """
+        current = self.positions(portfolios)
+        delta = self.targets(portfolios, current) - current
+        scale = 10**decimals
+        amounts = np.floor(np.abs(delta) * scale) / scale
+        trade = amounts >= max(min_trade, 1 / scale)
+        actions = []
+        for row, portfolio in enumerate(portfolios):
+            for action, side in (
+                (models.EarnManageRequestAction.WITHDRAW, delta[row] < 0),
+                (models.EarnManageRequestAction.DEPOSIT, delta[row] > 0),
+            ):
+                for column in np.flatnonzero(trade[row] & side):
+                    actions.append(
+                        {
+                            "owner": portfolio.owner,
+                            "chain": portfolio.chain,
+                            "venue": {
+                                "type": "VAULT",
+                                "vault_address": str(self.addresses[column]),
+                            },
+                            "action": action,
+                            "amount": f"{amounts[row, column]:.{decimals}f}",
+                            "gas_sponsorship": False,
+                        }
+                    )
+        return actions
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    cache = VaultCache(os.getenv("VAULT_CACHE", "vaults.parquet"))
+
+    with CompassAPI(api_key_auth=os.getenv("COMPASS_API_KEY")) as compass_api:
+        if not cache.fresh():
+            cache.write(VaultScanner(compass_api).scan())
+        allocator = VaultAllocator(cache.load(), min_tvl_usd=1_000_000)
+        portfolio = Portfolio(
+            os.getenv("WALLET_ADDRESS"), models.Chain.BASE, "USDC", cash=1000
+        )
+        # dry run: print the actions instead of building their transactions
+        for action in allocator.actions([portfolio]):
+            print(
+                f"{action['action'].value:>8} {action['amount']} "
+                f"{action['venue']['vault_address']}"
+            )
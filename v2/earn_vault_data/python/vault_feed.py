@@ -0,0 +1,223 @@
+"""Report only the Earn vaults whose metrics moved since they were last reported.
+
+``VaultFeed.sync()`` scans the vaults again (``VaultScanner``) and compares
+every vault, as it streams in, with its baseline: the tracked columns as they
+were when the vault was last reported. The baselines are kept in a small
+Parquet file next to the snapshot (``*.reported.parquet``), so the comparison
+is a dictionary lookup per vault. It yields a ``VaultChange`` for
+
+- a vault that is new,
+- a vault whose APY, TVL or fee moved by more than its ``Threshold``,
+- a vault that is no longer listed (after the scan has finished).
+
+A column's baseline only advances when its move is reported, so a slow drift
+is reported once it adds up to the threshold, however small every single
+step is. The first sync after the baseline file is lost starts from the
+cached snapshot (``VaultCache``).
+
+The baselines are saved when ``sync()`` ends, also when the caller stops
+iterating early, so every change that was handed out counts as reported.
+The snapshot itself is only replaced once the scan has gone through all
+vaults; a partial scan would drop the rest of them from the cache.
+
+Columns are tracked by name: every column containing a key of ``thresholds``
+(e.g. ``"apy"`` matches ``apy_7d`` and ``apy_30d``) uses that key's threshold.
+
+    feed = VaultFeed(VaultScanner(compass_api), VaultCache("vaults.parquet"))
+    for change in feed.sync():
+        rebalance(change.vault)
+
+    feed.run(on_change=print)  # the same as a callback
+
+    python vault_feed.py [seconds between scans]
+"""
+
+import os
+import sys
+import time
+
+from compass_api_sdk import CompassAPI
+from dotenv import load_dotenv
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from vault_scanner import (
+    VaultCache,
+    VaultScanner,
+    as_float,
+    flatten,
+    record_batch,
+    schema_of,
+)
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+
+
+class Threshold:
+    """A move counts once it exceeds ``absolute`` or ``relative`` (a fraction)."""
+
+    def __init__(self, absolute=None, relative=None):
+        self.absolute = absolute
+        self.relative = relative
+
+    def exceeded(self, old, new):
+        if old is None or new is None:
+            # appearing or disappearing is a change, staying unknown is not
+            return (old is None) != (new is None)
+        move = abs(new - old)
+        if self.absolute is not None and move > self.absolute:
+            return True
+        if self.relative is not None:
+            if old == 0:
+                return new != 0
+            return move / abs(old) > self.relative
+        return False
+
+
+DEFAULT_THRESHOLDS = {
+    "apy": Threshold(absolute=0.0005),  # 5 basis points
+    "cagr": Threshold(absolute=0.0005),
+    "tvl": Threshold(relative=0.05),
+    "fee": Threshold(absolute=0),  # any change
+}
+
+
+class VaultChange:
+    def __init__(self, kind, key, vault, fields=None):
+        self.kind = kind
+        # (chain, lowercase vault address)
+        self.key = key
+        # the new row of the vault (its last reported values for REMOVED)
+        self.vault = vault
+        # column -> (old, new) of the columns that moved beyond their threshold
+        self.fields = fields or {}
+
+    def __repr__(self):
+        return f"VaultChange({self.kind!r}, {self.key}, fields={self.fields})"
+
+
+def _key(row):
+    return (str(row["chain"]), row["vault_address"].lower())
+
+
+class VaultFeed:
+    def __init__(self, scanner, cache, thresholds=None, baseline_path=None):
+        self.scanner = scanner
+        self.cache = cache
+        self.thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+        self.baseline_path = (
+            baseline_path or f"{os.path.splitext(cache.path)[0]}.reported.parquet"
+        )
+
+    def _threshold(self, column):
+        for name, threshold in self.thresholds.items():
+            if name in column:
+                return threshold
+        return None
+
+    def _baseline(self):
+        """Last reported tracked columns, by vault key."""
+        if os.path.exists(self.baseline_path):
+            table = pq.read_table(self.baseline_path)
+        elif os.path.exists(self.cache.path):
+            tracked = [
+                column for column in self.cache.columns() if self._threshold(column)
+            ]
+            table = self.cache.load(columns=["chain", "vault_address", *tracked])
+        else:
+            return {}
+        return {_key(row): row for row in table.to_pylist()}
+
+    def _save_baseline(self, baseline):
+        rows = list(baseline.values())
+        schema = schema_of(rows)
+        tmp_path = f"{self.baseline_path}.tmp"
+        pq.write_table(
+            pa.Table.from_batches([record_batch(rows, schema)], schema=schema),
+            tmp_path,
+        )
+        os.replace(tmp_path, self.baseline_path)
+
+    def _compare(self, old, new):
+        fields = {}
+        for column, threshold in self._tracked(new).items():
+            before = as_float(old.get(column))
+            after = as_float(new.get(column))
+            if threshold.exceeded(before, after):
+                fields[column] = (before, after)
+        return fields
+
+    def _tracked(self, row):
+        return {
+            column: threshold
+            for column in row
+            if (threshold := self._threshold(column)) is not None
+        }
+
+    def _reported(self, row, columns):
+        """The baseline of ``row`` for ``columns``."""
+        return {
+            "chain": row["chain"],
+            "vault_address": row["vault_address"],
+            **{column: as_float(row.get(column)) for column in columns},
+        }
+
+    def sync(self):
+        """Scan and yield the changes against the baselines.
+
+        The baselines are saved however the iteration ends; the snapshot is
+        replaced only after a complete scan.
+        """
+        baseline = self._baseline()
+        unseen = set(baseline)
+        vaults = []
+        try:
+            for vault in self.scanner.scan():
+                vaults.append(vault)
+                row = flatten(vault)
+                key = _key(row)
+                unseen.discard(key)
+                old = baseline.get(key)
+                if old is None:
+                    baseline[key] = self._reported(row, self._tracked(row))
+                    yield VaultChange(ADDED, key, row)
+                    continue
+                fields = self._compare(old, row)
+                if fields:
+                    # only the reported columns move on, the others keep
+                    # adding up their drift
+                    baseline[key] = {**old, **self._reported(row, fields)}
+                    yield VaultChange(CHANGED, key, row, fields)
+            for key in unseen:
+                yield VaultChange(REMOVED, key, baseline.pop(key))
+            self.cache.write(vaults)
+        finally:
+            self._save_baseline(baseline)
+
+    def run(self, on_change):
+        """``sync()`` with a callback; returns the number of changes."""
+        count = 0
+        for change in self.sync():
+            on_change(change)
+            count += 1
+        return count
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+
+    with CompassAPI(api_key_auth=os.getenv("COMPASS_API_KEY")) as compass_api:
+        feed = VaultFeed(
+            VaultScanner(compass_api),
+            VaultCache(os.getenv("VAULT_CACHE", "vaults.parquet")),
+        )
+        while True:
+            count = feed.run(on_change=print)
+            print(f"{count} vaults changed")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,282 @@
+"""Scan every Earn vault on every chain into a local Parquet file.
+
+``main.py`` asks the API for one vault. Ranking dashboards need all of them,
+and one API call per query does not scale. ``VaultScanner`` lists
+``earn_vaults`` page by page:
+
+- each chain is listed on its own, with up to ``pages_in_flight`` pages of a
+  chain requested at once (the first page tells how many there are),
+- ``scan()`` is a generator: vaults are yielded as their page arrives,
+- a vault that moves between pages while the scan runs is yielded once.
+
+``VaultCache`` writes that stream to Parquet in record batches, one column per
+vault field of the SDK model. Metric columns (the API sends decimal strings)
+are stored as float64, so ranking and filtering run vectorised in pyarrow on
+the local file:
+
+    cache = VaultCache("vaults.parquet")
+    cache.write(VaultScanner(compass_api).scan())
+    top(cache.load(), "one_month_cagr_net", n=10, chain="ethereum")
+
+    python vault_scanner.py [metric]
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from compass_api_sdk import CompassAPI, models
+from dotenv import load_dotenv
+
+# identifying, descriptive and nested (JSON) columns, never converted to numbers
+TEXT_COLUMNS = {
+    "vault_address",
+    "chain",
+    "owner",
+    "asset",
+    "name",
+    "symbol",
+    "asset_name",
+    "asset_symbol",
+    "protocol",
+    "factory_version",
+    "markets",
+}
+
+
+def _chains():
+    # the vault listing has its own chain enum in some SDK releases
+    return list(getattr(models, "V2EarnVaultsChain", models.Chain))
+
+
+def _vault_fields():
+    # the SDK leaves unset fields out of model_dump, so a batch of vaults may
+    # lack a column that later vaults have
+    model = getattr(models, "VaultInfo", None)
+    return list(model.model_fields) if model is not None else []
+
+
+class VaultScanner:
+    def __init__(
+        self, compass, chains=None, page_size=100, pages_in_flight=4, **filters
+    ):
+        self.compass = compass
+        self.chains = chains or _chains()
+        self.page_size = page_size
+        self.pages_in_flight = pages_in_flight
+        # passed on to earn_vaults, e.g. min_tvl_usd=100_000
+        self.filters = filters
+        self.pages = 0
+
+    def _page(self, chain, offset):
+        return self.compass.earn.earn_vaults(
+            chain=chain,
+            offset=offset,
+            limit=self.page_size,
+            **self.filters,
+        )
+
+    def scan(self):
+        """Yield every vault (an SDK model) of every chain, as pages arrive."""
+        seen = set()
+        next_offset = {chain: 0 for chain in self.chains}
+        # chain -> offset past the last vault; the first page tells. Without a
+        # ``total`` in the response, a short page marks the end instead.
+        end = {chain: None for chain in self.chains}
+        in_flight = {}  # future -> (chain, offset)
+        max_workers = self.pages_in_flight * len(self.chains)
+        with ThreadPoolExecutor(max_workers, thread_name_prefix="vaults") as pool:
+
+            def fill(chain):
+                running = sum(1 for c, _ in in_flight.values() if c == chain)
+                while running < self.pages_in_flight and (
+                    end[chain] is None or next_offset[chain] < end[chain]
+                ):
+                    offset = next_offset[chain]
+                    in_flight[pool.submit(self._page, chain, offset)] = chain, offset
+                    next_offset[chain] += self.page_size
+                    running += 1
+
+            for chain in self.chains:
+                in_flight[pool.submit(self._page, chain, 0)] = chain, 0
+                next_offset[chain] = self.page_size
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chain, offset = in_flight.pop(future)
+                    page = future.result()
+                    self.pages += 1
+                    total = getattr(page, "total", None)
+                    if total is not None:
+                        end[chain] = total
+                    elif len(page.vaults) < self.page_size:
+                        last = offset + len(page.vaults)
+                        end[chain] = min(last, end[chain] or last)
+                    fill(chain)
+                    for vault in page.vaults:
+                        key = (str(vault.chain), vault.vault_address.lower())
+                        if key not in seen:
+                            seen.add(key)
+                            yield vault
+
+
+def flatten(vault):
+    """The vault as a row of the cache: plain values, nested ones as JSON."""
+    row = vault.model_dump(mode="json")
+    for column, value in row.items():
+        if isinstance(value, (list, dict)):
+            # nested data (e.g. market allocations) is kept as a JSON string
+            row[column] = json.dumps(value)
+    return row
+
+
+def as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) or (
+        isinstance(value, str) and as_float(value) is not None
+    )
+
+
+def schema_of(rows):
+    """Column types for ``rows``: float64 for metrics, string for the rest.
+
+    Every field of the SDK vault model is a column, whether ``rows`` have it
+    or not.
+    """
+    fields = []
+    columns = list(
+        dict.fromkeys([*_vault_fields(), *(column for row in rows for column in row)])
+    )
+    for column in columns:
+        values = [row.get(column) for row in rows if row.get(column) is not None]
+        # a metric that is null throughout the first batch is still a metric
+        numeric = column not in TEXT_COLUMNS and all(map(_is_number, values))
+        fields.append(pa.field(column, pa.float64() if numeric else pa.string()))
+    return pa.schema(fields)
+
+
+def record_batch(rows, schema):
+    """``rows`` as a batch of ``schema``; raises ``ValueError`` if they do not fit.
+
+    A column missing from the schema, or a metric column with a value that is
+    not a number, would otherwise be written as null without a word.
+    """
+    unknown = set().union(*rows) - set(schema.names)
+    if unknown:
+        raise ValueError(f"columns not in the cache schema: {sorted(unknown)}")
+    columns = {}
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if pa.types.is_floating(field.type):
+            wrong = [v for v in values if v is not None and not _is_number(v)]
+            if wrong:
+                raise ValueError(f"{field.name} is not a number: {wrong[0]!r}")
+            columns[field.name] = [as_float(value) for value in values]
+        else:
+            columns[field.name] = [
+                None if value is None else str(value) for value in values
+            ]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def to_table(vaults):
+    """SDK vaults (e.g. ``earn_vaults(...).vaults``) as a table like the cache."""
+    rows = [flatten(vault) for vault in vaults]
+    schema = schema_of(rows)
+    return pa.Table.from_batches([record_batch(rows, schema)], schema=schema)
+
+
+class VaultCache:
+    def __init__(self, path, ttl=15 * 60):
+        self.path = path
+        self.ttl = ttl
+
+    def fresh(self):
+        """Whether the file exists and was written less than ``ttl`` seconds ago."""
+        if not os.path.exists(self.path):
+            return False
+        return time.time() - os.path.getmtime(self.path) < self.ttl
+
+    def write(self, vaults, batch_size=1000):
+        """Stream ``vaults`` into the Parquet file, ``batch_size`` rows at a time.
+
+        The column types are taken from the first batch; a later batch that
+        does not fit them raises ``ValueError`` and leaves the previous file in
+        place. The file is replaced atomically once the stream is exhausted.
+        Returns the number of vaults.
+        """
+        tmp_path = f"{self.path}.tmp"
+        writer = schema = None
+        count = 0
+        rows = []
+
+        def flush():
+            nonlocal writer, schema
+            if schema is None:
+                schema = schema_of(rows)
+                writer = pq.ParquetWriter(tmp_path, schema)
+            writer.write_batch(record_batch(rows, schema))
+            rows.clear()
+
+        try:
+            for vault in vaults:
+                rows.append(flatten(vault))
+                count += 1
+                if len(rows) >= batch_size:
+                    flush()
+            if rows or writer is None:
+                flush()
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(tmp_path, self.path)
+        return count
+
+    def columns(self):
+        """Column names of the cached file, without reading any data."""
+        return pq.read_schema(self.path).names
+
+    def load(self, columns=None):
+        """The cached vaults as a ``pyarrow.Table`` (optionally only ``columns``)."""
+        return pq.read_table(self.path, columns=columns)
+
+
+def top(table, metric, n=10, chain=None, ascending=False):
+    """The ``n`` best vaults by ``metric``, optionally of one ``chain`` only."""
+    if chain is not None:
+        chain = str(getattr(chain, "value", chain))
+        table = table.filter(pc.equal(table["chain"], chain))
+    table = table.filter(pc.is_valid(table[metric]))
+    order = "ascending" if ascending else "descending"
+    return table.sort_by([(metric, order)]).slice(0, n)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    metric = sys.argv[1] if len(sys.argv) > 1 else "one_month_cagr_net"
+    cache = VaultCache(os.getenv("VAULT_CACHE", "vaults.parquet"))
+
+    if not cache.fresh():
+        with CompassAPI(api_key_auth=os.getenv("COMPASS_API_KEY")) as compass_api:
+            scanner = VaultScanner(compass_api)
+            start = time.perf_counter()
+            count = cache.write(scanner.scan())
+            print(
+                f"Scanned {count} vaults in {scanner.pages} pages "
+                f"({time.perf_counter() - start:.1f}s)"
+            )
+
+    table = cache.load()
+    for row in top(table, metric).to_pylist():
+        print(f"{row['chain']:>10} {row['name']}: {row[metric]}")
@@ -0,0 +1,91 @@
+"""asyncio version of main.py: fund the Earn Accounts of any number of owners
+with gas sponsorship, driven by one event loop.
+
+All flows share one sender. Its ``AsyncTxSubmitter`` hands out the sender's
+nonces, so the sponsored transfers go out concurrently without colliding.
+"""
+
+import asyncio
+import os
+
+from compass_api_sdk import CompassAPI, models
+from compass_common import AsyncTxSubmitter
+from dotenv import load_dotenv
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from web3 import AsyncWeb3
+
+load_dotenv()
+
+COMPASS_API_KEY = os.getenv("COMPASS_API_KEY")
+# comma-separated; one sponsored transfer runs per owner
+OWNER_PRIVATE_KEYS = (
+    os.getenv("OWNER_PRIVATE_KEYS") or os.getenv("OWNER_PRIVATE_KEY")
+).split(",")
+SENDER_PRIVATE_KEY = os.getenv("SENDER_PRIVATE_KEY")
+BASE_RPC_URL = os.getenv("BASE_RPC_URL")
+MAX_CONCURRENT_FLOWS = int(os.getenv("MAX_CONCURRENT_FLOWS", "100"))
+
+
+async def gasless_transfer_flow(compass_api, sender, owner_private_key, amount="0.1"):
+    owner_account = Account.from_key(owner_private_key)
+
+    # Get EIP-712 typed data for gas-sponsored transfer
+    transfer_response = await compass_api.earn.earn_transfer_async(
+        owner=owner_account.address,
+        chain=models.Chain.BASE,
+        token="USDC",
+        amount=amount,
+        action=models.EarnTransferRequestAction.DEPOSIT,
+        gas_sponsorship=True,
+        spender=sender.address,
+    )
+
+    # Owner signs the transfer typed data off-chain
+    transfer_typed_data = transfer_response.eip_712.model_dump(by_alias=True)
+    transfer_encoded = encode_typed_data(full_message=transfer_typed_data)
+    transfer_signature = owner_account.sign_message(transfer_encoded).signature.hex()
+
+    # Prepare gas-sponsored transfer transaction
+    prepare_transfer_response = (
+        await compass_api.gas_sponsorship.gas_sponsorship_prepare_async(
+            owner=owner_account.address,
+            chain=models.Chain.BASE,
+            eip_712=transfer_typed_data,
+            signature=transfer_signature,
+            sender=sender.address,
+        )
+    )
+
+    # Sender signs and broadcasts the transfer transaction
+    receipt = await sender.send(prepare_transfer_response)
+    return AsyncWeb3.to_hex(receipt["transactionHash"])
+
+
+async def main():
+    w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(BASE_RPC_URL))
+    sender = AsyncTxSubmitter(w3, SENDER_PRIVATE_KEY)
+    limit = asyncio.Semaphore(MAX_CONCURRENT_FLOWS)
+
+    print("=== Fund Earn Accounts with Gas Sponsorship ===\n")
+    async with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
+
+        async def run(owner_private_key):
+            async with limit:
+                return await gasless_transfer_flow(
+                    compass_api, sender, owner_private_key
+                )
+
+        results = await asyncio.gather(
+            *(run(key.strip()) for key in OWNER_PRIVATE_KEYS),
+            return_exceptions=True,
+        )
+
+    for key, result in zip(OWNER_PRIVATE_KEYS, results):
+        print(Account.from_key(key.strip()).address, result)
+    if any(isinstance(result, Exception) for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
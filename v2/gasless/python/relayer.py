@@ -0,0 +1,272 @@
+"""Relay gas-sponsored transfers of many owners from several sender wallets.
+
+``main_async.py`` runs one flow per owner: prepare, send, wait for the
+receipt, one owner at a time per sender nonce. ``SponsorRelayer`` turns the
+relaying part into a pipeline:
+
+1. ``assign()`` picks a sender from the ``SenderPool`` (the least busy one
+   with enough ETH). Its address goes into ``earn_transfer(spender=...)``,
+   because the owner's EIP-712 signature is only valid for that sender.
+2. ``relay()`` queues the signed typed data. Requests that arrive within
+   ``max_wait`` seconds of each other (up to ``max_batch``) form one batch.
+3. The ``gas_sponsorship_prepare`` calls of a batch run concurrently, at most
+   ``max_in_flight`` at a time.
+4. Every sender is a separate nonce lane (its own ``AsyncTxSubmitter``): its
+   prepared transactions are sent back to back and confirmed together.
+
+Each ``relay()`` call returns the receipt of its own transaction, or raises
+if its prepare, broadcast or transaction failed; the rest of the batch is
+not affected.
+
+    relayer = SponsorRelayer(compass_api, SenderPool(w3, SENDER_PRIVATE_KEYS))
+    sender = relayer.assign()
+    typed_data = (await compass_api.earn.earn_transfer_async(
+        ..., gas_sponsorship=True, spender=sender)).eip_712.model_dump(by_alias=True)
+    receipt = await relayer.relay(owner, typed_data, signature, sender)
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from compass_api_sdk import CompassAPI, models
+from compass_common import TransactionFailed
+from dotenv import load_dotenv
+from eth_account import Account
+from web3 import AsyncWeb3
+
+from sender_pool import SenderPool
+from typed_data_signer import TypedDataSigner
+
+logger = logging.getLogger(__name__)
+
+
+class RelayRequest:
+    def __init__(self, owner, eip_712, signature, sender, future):
+        self.owner = owner
+        self.eip_712 = eip_712
+        self.signature = signature
+        self.sender = sender
+        self.future = future
+
+
+class SponsorRelayer:
+    def __init__(
+        self,
+        compass,
+        pool,
+        chain=models.Chain.BASE,
+        max_batch=100,
+        max_wait=0.2,
+        max_in_flight=50,
+    ):
+        self.compass = compass
+        self.chain = chain
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pool = pool
+        self._api_slots = asyncio.Semaphore(max_in_flight)
+        self._queue = None
+        self._task = None
+        self._batches = set()
+
+    def assign(self):
+        """Address of the sender that should sponsor the next transfer.
+
+        Pass it as ``spender`` to ``earn_transfer`` and as ``sender`` to
+        ``relay()``. An assignment that is not relayed after all must be given
+        back with ``release()``.
+        """
+        return self.pool.pick().address
+
+    def release(self, sender):
+        self.pool.release(self.pool[sender])
+
+    async def relay(self, owner, eip_712, signature, sender):
+        """Queue one signed transfer; returns the receipt of its transaction."""
+        if sender not in self.pool.senders:
+            raise ValueError(f"{sender} is not one of the relayer's senders")
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(RelayRequest(owner, eip_712, signature, sender, future))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            # collect the next batch while this one is prepared and confirmed
+            task = asyncio.create_task(self._process(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _prepare(self, request):
+        async with self._api_slots:
+            return await self.compass.gas_sponsorship.gas_sponsorship_prepare_async(
+                owner=request.owner,
+                chain=self.chain,
+                eip_712=request.eip_712,
+                signature=request.signature,
+                sender=request.sender,
+            )
+
+    async def _process(self, batch):
+        try:
+            await self._process_batch(batch)
+        except Exception as e:
+            # whatever went wrong, no relay() of the batch may wait forever
+            logger.exception("relay batch failed")
+            for request in batch:
+                if not request.future.done():
+                    self._fail(request, e)
+
+    async def _process_batch(self, batch):
+        try:
+            await self.pool.maybe_refresh()
+        except Exception:
+            # the cached balances still do; the next batch tries again
+            logger.warning("sender balance refresh failed", exc_info=True)
+        responses = await asyncio.gather(
+            *(self._prepare(request) for request in batch), return_exceptions=True
+        )
+        by_sender = {}  # sender -> [(request, response)]
+        for request, response in zip(batch, responses):
+            if isinstance(response, Exception):
+                self._fail(request, response)
+            else:
+                by_sender.setdefault(request.sender, []).append((request, response))
+        await asyncio.gather(
+            *(self._send(sender, prepared) for sender, prepared in by_sender.items())
+        )
+
+    async def _send(self, address, prepared):
+        sender = self.pool[address]
+        sent = []  # (request, tx hash)
+        for request, response in prepared:
+            try:
+                sent.append((request, await sender.lane.submit(response)))
+            except Exception as e:
+                self._fail(request, e)
+                continue
+            self.pool.sent(sender)
+        # confirmed one by one: a timeout fails its own request only
+        results = await asyncio.gather(
+            *(
+                sender.lane.confirm([tx_hash], raise_on_revert=False)
+                for _, tx_hash in sent
+            ),
+            return_exceptions=True,
+        )
+        for (request, tx_hash), result in zip(sent, results):
+            if isinstance(result, Exception):
+                self._fail(request, result)
+                continue
+            [receipt] = result
+            self.pool.record(sender, receipt)
+            if receipt["status"] == 1:
+                request.future.set_result(receipt)
+            else:
+                request.future.set_exception(TransactionFailed(tx_hash, receipt))
+
+    def _fail(self, request, error):
+        self.pool.record(self.pool[request.sender], error=error)
+        if not request.future.done():
+            request.future.set_exception(error)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._batches):
+            task.cancel()
+
+
+# every owner signs the same transfer schema: compile it once
+signer = TypedDataSigner()
+
+
+async def sponsored_transfer(compass_api, relayer, owner_private_key, amount="0.1"):
+    owner_account = Account.from_key(owner_private_key)
+    sender = relayer.assign()
+    try:
+        transfer_response = await compass_api.earn.earn_transfer_async(
+            owner=owner_account.address,
+            chain=relayer.chain,
+            token="USDC",
+            amount=amount,
+            action=models.EarnTransferRequestAction.DEPOSIT,
+            gas_sponsorship=True,
+            spender=sender,
+        )
+        typed_data = transfer_response.eip_712.model_dump(by_alias=True)
+        signature = signer.sign(typed_data, owner_private_key)
+    except Exception:
+        relayer.release(sender)
+        raise
+    receipt = await relayer.relay(owner_account.address, typed_data, signature, sender)
+    return AsyncWeb3.to_hex(receipt["transactionHash"])
+
+
+async def main():
+    load_dotenv()
+    owner_private_keys = [
+        key.strip()
+        for key in (
+            os.getenv("OWNER_PRIVATE_KEYS") or os.getenv("OWNER_PRIVATE_KEY")
+        ).split(",")
+    ]
+    sender_private_keys = [
+        key.strip()
+        for key in (
+            os.getenv("SENDER_PRIVATE_KEYS") or os.getenv("SENDER_PRIVATE_KEY")
+        ).split(",")
+    ]
+    w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(os.getenv("BASE_RPC_URL")))
+
+    async with CompassAPI(api_key_auth=os.getenv("COMPASS_API_KEY")) as compass_api:
+        # the funder tops up senders that run low on ETH (optional)
+        pool = SenderPool(
+            w3, sender_private_keys, funder_private_key=os.getenv("FUNDER_PRIVATE_KEY")
+        )
+        relayer = SponsorRelayer(compass_api, pool)
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                sponsored_transfer(compass_api, relayer, key)
+                for key in owner_private_keys
+            ),
+            return_exceptions=True,
+        )
+        await relayer.close()
+        await pool.close()
+    elapsed = time.perf_counter() - start
+
+    for key, result in zip(owner_private_keys, results):
+        print(Account.from_key(key).address, result)
+    print(
+        f"{len(results)} sponsored transfers from {len(sender_private_keys)} "
+        f"senders in {elapsed:.1f}s"
+    )
+    for address, stats in pool.stats().items():
+        print(address, stats)
+    if any(isinstance(result, Exception) for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,225 @@
+"""A pool of sender wallets that pay for sponsored transactions.
+
+Every sponsored transaction is broadcast (and paid for) by a sender. With a
+single sender all of them share one nonce sequence, and a sender that runs
+out of ETH stops everything. ``SenderPool`` spreads the work over N senders:
+
+- ``pick()`` returns the sender with the fewest unfinished transactions
+  (the shortest nonce lane); between equally busy senders the one with the
+  most ETH wins. Senders below ``min_balance`` are only picked when every
+  sender is that low.
+- balances are read from the node by ``refresh()`` and in between lowered by
+  the gas of every confirmed transaction (``record()``), so picking a sender
+  costs no RPC call. ``maybe_refresh()`` refreshes at most every
+  ``refresh_every`` seconds.
+- with a ``funder_private_key``, ``refresh()`` tops every sender below
+  ``min_balance`` up to ``top_up_to`` from the funder wallet. The top-ups
+  run as a background task, so ``refresh()`` does not wait for them to be
+  mined; ``close()`` does.
+- ``stats()`` reports per sender what it sent, confirmed and failed, its
+  throughput and its balance.
+
+    pool = SenderPool(w3, SENDER_PRIVATE_KEYS, funder_private_key=FUNDER_KEY)
+    await pool.refresh()
+    sender = pool.pick()
+    tx_hash = await sender.lane.submit(prepared_response)
+    [receipt] = await sender.lane.confirm([tx_hash])
+    pool.record(sender, receipt)
+    await pool.close()
+"""
+
+import asyncio
+import logging
+import time
+
+from compass_common import AsyncTxSubmitter
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+MIN_BALANCE = Web3.to_wei(0.001, "ether")
+TOP_UP_TO = Web3.to_wei(0.005, "ether")
+
+
+class Sender:
+    def __init__(self, lane):
+        # the sender's own nonce sequence
+        self.lane = lane
+        self.address = lane.address
+        self.balance = None  # wei, as last read or estimated
+        self.pending = 0  # picked and not recorded yet
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.gas_spent = 0  # wei
+        self.topped_up = 0  # wei
+        self.started_at = time.monotonic()
+
+    def throughput(self):
+        """Confirmed transactions per minute since the pool was created."""
+        return self.confirmed * 60 / max(time.monotonic() - self.started_at, 1e-9)
+
+    def __repr__(self):
+        return f"Sender({self.address}, pending={self.pending}, balance={self.balance})"
+
+
+class SenderPool:
+    def __init__(
+        self,
+        w3,
+        private_keys,
+        funder_private_key=None,
+        min_balance=MIN_BALANCE,
+        top_up_to=TOP_UP_TO,
+        refresh_every=60,
+    ):
+        self.w3 = w3
+        self.senders = {}
+        for key in private_keys:
+            sender = Sender(AsyncTxSubmitter(w3, key))
+            self.senders[sender.address] = sender
+        self.funder = (
+            AsyncTxSubmitter(w3, funder_private_key) if funder_private_key else None
+        )
+        self.min_balance = min_balance
+        self.top_up_to = top_up_to
+        self.refresh_every = refresh_every
+        self._refreshed_at = None
+        self._refresh_lock = asyncio.Lock()
+        self._topping_up = set()  # addresses with a top-up in flight
+        self._top_ups = set()  # running top-up tasks
+
+    def __len__(self):
+        return len(self.senders)
+
+    def __getitem__(self, address):
+        return self.senders[address]
+
+    def pick(self):
+        """The sender for the next transaction; it counts as pending until
+        ``record()`` or ``release()``."""
+
+        def rank(sender):
+            balance = sender.balance if sender.balance is not None else 0
+            # unknown balances are not held against a sender before refresh()
+            low = sender.balance is not None and balance < self.min_balance
+            return (low, sender.pending, -balance)
+
+        sender = min(self.senders.values(), key=rank)
+        sender.pending += 1
+        return sender
+
+    def release(self, sender):
+        """Give back a pick whose transaction was never broadcast."""
+        sender.pending -= 1
+
+    def sent(self, sender):
+        sender.sent += 1
+
+    def record(self, sender, receipt=None, error=None):
+        """Finish a pick: its transaction was mined (``receipt``) or failed."""
+        sender.pending -= 1
+        if receipt is not None:
+            fee = receipt["gasUsed"] * receipt.get("effectiveGasPrice", 0)
+            sender.gas_spent += fee
+            if sender.balance is not None:
+                sender.balance -= fee
+        if receipt is not None and receipt["status"] == 1 and error is None:
+            sender.confirmed += 1
+        else:
+            sender.failed += 1
+
+    async def maybe_refresh(self):
+        if (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at >= self.refresh_every
+        ):
+            await self.refresh()
+
+    async def refresh(self):
+        """Read every balance and top up the senders that run low."""
+        async with self._refresh_lock:
+            senders = list(self.senders.values())
+            balances = await asyncio.gather(
+                *(self.w3.eth.get_balance(sender.address) for sender in senders)
+            )
+            for sender, balance in zip(senders, balances):
+                sender.balance = balance
+            self._refreshed_at = time.monotonic()
+            low = [
+                sender
+                for sender in senders
+                if sender.balance < self.min_balance
+                and sender.address not in self._topping_up
+            ]
+            if low and self.funder is not None:
+                self._topping_up.update(sender.address for sender in low)
+                task = asyncio.create_task(self._top_up(low))
+                self._top_ups.add(task)
+                task.add_done_callback(self._top_ups.discard)
+
+    async def close(self):
+        """Wait for the top-ups in flight."""
+        await asyncio.gather(*self._top_ups, return_exceptions=True)
+
+    async def _top_up(self, senders):
+        try:
+            block = await self.w3.eth.get_block("latest")
+            priority_fee = await self.w3.eth.max_priority_fee
+            fees = {
+                "maxFeePerGas": 2 * block["baseFeePerGas"] + priority_fee,
+                "maxPriorityFeePerGas": priority_fee,
+            }
+            chain_id = await self.w3.eth.chain_id
+            amounts = {}  # tx hash -> (sender, wei)
+            for sender in senders:
+                # the balance keeps changing while the top-up is on its way
+                amount = self.top_up_to - sender.balance
+                tx_hash = await self.funder.submit(
+                    {
+                        "from": self.funder.address,
+                        "to": sender.address,
+                        "value": amount,
+                        "gas": 21000,
+                        "chainId": chain_id,
+                        **fees,
+                    }
+                )
+                amounts[tx_hash] = (sender, amount)
+            receipts = await self.funder.confirm(list(amounts))
+            funded = [
+                sender_amount
+                for sender_amount, receipt in zip(amounts.values(), receipts)
+                if receipt["status"] == 1
+            ]
+            balances = await asyncio.gather(
+                *(self.w3.eth.get_balance(sender.address) for sender, _ in funded)
+            )
+            for (sender, amount), balance in zip(funded, balances):
+                sender.topped_up += amount
+                sender.balance = balance
+        except Exception:
+            # the next refresh() finds the senders still low and tries again
+            logger.warning("sender top-up failed", exc_info=True)
+        finally:
+            self._topping_up.difference_update(sender.address for sender in senders)
+
+    def stats(self):
+        """Per sender address: counters, throughput and balance in ETH."""
+        return {
+            sender.address: {
+                "sent": sender.sent,
+                "confirmed": sender.confirmed,
+                "failed": sender.failed,
+                "pending": sender.pending,
+                "tx_per_minute": round(sender.throughput(), 2),
+                "balance_eth": (
+                    None
+                    if sender.balance is None
+                    else float(Web3.from_wei(sender.balance, "ether"))
+                ),
+                "gas_spent_eth": float(Web3.from_wei(sender.gas_spent, "ether")),
+                "topped_up_eth": float(Web3.from_wei(sender.topped_up, "ether")),
+            }
+            for sender in self.senders.values()
+        }
@@ -0,0 +1,90 @@
+"""asyncio version of main.py: deposit into the Morpho vault and read back
+the Earn Account positions for any number of wallets at once, driven by one
+event loop."""
+
+import asyncio
+import os
+
+from compass_api_sdk import CompassAPI, models
+from compass_common import AsyncTxSubmitter
+from dotenv import load_dotenv
+from eth_account import Account
+from web3 import AsyncWeb3
+
+load_dotenv()
+
+COMPASS_API_KEY = os.getenv("COMPASS_API_KEY")
+# comma-separated; one deposit runs per key
+PRIVATE_KEYS = (os.getenv("PRIVATE_KEYS") or os.getenv("PRIVATE_KEY")).split(",")
+BASE_RPC_URL = os.getenv("BASE_RPC_URL")
+MAX_CONCURRENT_FLOWS = int(os.getenv("MAX_CONCURRENT_FLOWS", "100"))
+
+VAULT_ADDRESS = "0xbeeF010f9cb27031ad51e3333f9aF9C6B1228183"
+
+
+async def manage_earn_position_flow(compass_api, w3, private_key, amount="0.5"):
+    wallet_address = Account.from_key(private_key).address
+
+    # Get unsigned transaction to deposit into Morpho vault
+    manage_response = await compass_api.earn.earn_manage_async(
+        owner=wallet_address,
+        chain=models.Chain.BASE,
+        venue={
+            "type": "VAULT",
+            "vault_address": VAULT_ADDRESS,
+        },
+        action=models.EarnManageRequestAction.DEPOSIT,
+        amount=amount,
+        gas_sponsorship=False,
+        fee=None,
+    )
+
+    # Sign and broadcast transaction
+    receipt = await AsyncTxSubmitter(w3, private_key).send(manage_response)
+    print(
+        f"{wallet_address}: deposit confirmed in block {receipt['blockNumber']} "
+        f"({AsyncWeb3.to_hex(receipt['transactionHash'])})"
+    )
+
+    # Check Earn Account positions
+    positions_response = await compass_api.earn.earn_positions_async(
+        chain=models.Chain.BASE,
+        user_address=wallet_address,
+        days=100,
+    )
+    return positions_response.user_positions
+
+
+async def main():
+    w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(BASE_RPC_URL))
+    limit = asyncio.Semaphore(MAX_CONCURRENT_FLOWS)
+
+    async with CompassAPI(api_key_auth=COMPASS_API_KEY) as compass_api:
+
+        async def run(private_key):
+            async with limit:
+                return await manage_earn_position_flow(compass_api, w3, private_key)
+
+        results = await asyncio.gather(
+            *(run(key.strip()) for key in PRIVATE_KEYS), return_exceptions=True
+        )
+
+    failed = False
+    for key, result in zip(PRIVATE_KEYS, results):
+        print(f"\n{Account.from_key(key.strip()).address}")
+        if isinstance(result, Exception):
+            failed = True
+            print(f"failed: {result!r}")
+            continue
+        print(f"Positions: {len(result)}")
+        for position in result:
+            if position.TYPE == "VAULT":
+                print(f"{position.vault_name}: {position.amount_in_underlying_token} {position.token_name}")
+            elif position.TYPE == "AAVE":
+                print(f"Aave {position.token_name}: {position.amount_in_underlying_token}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())